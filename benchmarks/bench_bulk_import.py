@@ -0,0 +1,76 @@
+"""
+Compare importing a whole Steam library one game at a time against the bulk endpoint.
+
+Seeds a throwaway SQLite database from Data/ and imports --games owned games for fresh
+users through the ASGI app, either as one POST /api/v1/user_game/ per game (each doing
+an existence check, a commit and a recompute) or as a single POST /api/v1/user_game/bulk/.
+Background recomputes run inside the request here, so the timings include them. They
+share the app's pooled engine, so the statement count includes them too.
+
+Usage (from the project root):
+    python benchmarks/bench_bulk_import.py --games 300 --libraries 3
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from src.utils.sample_data import seed_database
+
+
+def library(appids: list, n_games: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [{"appid": appid, "shelf": "played", "rating": float(rng.randint(1, 5))}
+            for appid in rng.sample(appids, n_games)]
+
+
+def import_per_item(client, username: str, games: list):
+    for game in games:
+        response = client.post("/api/v1/user_game/", json={"username": username, **game})
+        response.raise_for_status()
+
+
+def import_bulk(client, username: str, games: list):
+    response = client.post("/api/v1/user_game/bulk/", json={"username": username, "games": games})
+    response.raise_for_status()
+    assert response.json()["inserted"] == len(games)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-item vs bulk library import")
+    parser.add_argument("--games", type=int, default=300, help="Games per imported library")
+    parser.add_argument("--libraries", type=int, default=3, help="Libraries imported per method")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{os.path.join(workdir, 'bulk_import.sqlite')}"
+        catalog = seed_database(database_url)
+        os.environ["Internal_Database_Url"] = database_url
+
+        from fastapi.testclient import TestClient
+        from sqlalchemy import event
+        import src.main
+
+        statements = []
+        event.listen(src.main.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        print(f"{'method':<10} {'games':>6} {'seconds':>9} {'games/s':>9} {'app db statements':>18}")
+        with TestClient(src.main.app) as client:
+            for method, run in (("per_item", import_per_item), ("bulk", import_bulk)):
+                timings, counts = [], []
+                for i in range(args.libraries):
+                    games = library(catalog["appids"], args.games, seed=i)
+                    statements.clear()
+                    start = time.perf_counter()
+                    run(client, f"bench_{method}_{i}", games)
+                    timings.append(time.perf_counter() - start)
+                    counts.append(len(statements))
+                seconds = statistics.median(timings)
+                print(f"{method:<10} {args.games:>6} {seconds:>9.3f} {args.games / seconds:>9.1f} "
+                      f"{statistics.median(counts):>18.0f}")
+        src.main.engine.dispose()
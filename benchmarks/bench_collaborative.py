@@ -0,0 +1,59 @@
+"""
+Benchmark ALS training time and memory as the number of users and games grows.
+
+Interactions are synthetic: every user owns a random handful of games, with a
+popularity skew so a few games appear in many libraries (like the real catalog).
+
+Usage (from the project root):
+    python benchmarks/bench_collaborative.py --factors 32 --iterations 10
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.collaborative_pipeline import train_als
+
+# (users, games) pairs to benchmark
+SCALES = [(1_000, 1_500), (10_000, 1_500), (10_000, 20_000), (50_000, 50_000)]
+
+
+def synthetic_interactions(n_users: int, n_items: int, games_per_user: int, seed: int = 0) -> csr_matrix:
+    """Random users x games confidence matrix with a Zipf-like popularity skew"""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, n_items + 1)
+    popularity /= popularity.sum()
+    rows = np.repeat(np.arange(n_users), games_per_user)
+    cols = rng.choice(n_items, size=n_users * games_per_user, p=popularity)
+    confidence = 40.0 * (1.0 + rng.integers(0, 6, size=len(rows)))
+    matrix = csr_matrix((confidence.astype(np.float32), (rows, cols)), shape=(n_users, n_items))
+    matrix.sum_duplicates()
+    return matrix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark collaborative filtering training")
+    parser.add_argument("--factors", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--games-per-user", type=int, default=30)
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'games':>8} {'nnz':>10} {'train s':>9} {'s/iter':>8} {'peak MB':>9}")
+    for n_users, n_items in SCALES:
+        interactions = synthetic_interactions(n_users, n_items, args.games_per_user)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        train_als(interactions, factors=args.factors, iterations=args.iterations, n_jobs=args.n_jobs)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"{n_users:>8} {n_items:>8} {interactions.nnz:>10} {elapsed:>9.2f} "
+              f"{elapsed / args.iterations:>8.3f} {peak / 1e6:>9.1f}")
@@ -0,0 +1,79 @@
+"""
+Measure the accuracy/memory trade-off of reduced-precision profile vectors.
+
+Two kinds of profiles are scored against a float64 baseline:
+    als   - game factors from implicit ALS on synthetic libraries, scored by dot product
+    tags  - dense l2-normalized game tag profiles built from Data/, scored by cosine
+            against mean-of-library user profiles (what CatalogModel.user_vector produces)
+
+For every precision it reports the memory of the game profiles, the time to score a
+batch of users and recall@k: the share of the float64 top-k that is still in the top-k.
+
+Usage (from the project root):
+    python benchmarks/bench_quantization.py --users 2000 --games 20000 --k 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "benchmarks"))
+from bench_collaborative import synthetic_interactions
+from src.catalog_model import CatalogModel
+from src.collaborative_pipeline import train_als
+from src.quantization import QuantizedVectors, recall_at_k
+
+PRECISIONS = ["float64", "float32", "float16", "int8"]
+
+
+def als_profiles(n_users: int, n_games: int, factors: int) -> tuple[np.ndarray, np.ndarray]:
+    """(user profiles, game profiles) from ALS on synthetic libraries"""
+    interactions = synthetic_interactions(n_users, n_games, games_per_user=30)
+    user_factors, item_factors = train_als(interactions, factors=factors, iterations=5)
+    return user_factors.astype(np.float64), item_factors.astype(np.float64)
+
+
+def tag_profiles(n_users: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """(user profiles, game profiles) as dense tag vectors of the games in Data/"""
+    tags = pd.read_csv(os.path.join(PROJECT_ROOT, "Data", "steam_tags.csv"))
+    game_tags = pd.read_csv(os.path.join(PROJECT_ROOT, "Data", "steam_game_tags.csv"), dtype={"appid": str})
+    model = CatalogModel.from_id_pairs(game_tags["appid"].to_numpy(), game_tags["tag_id"].to_numpy(),
+                                       dict(zip(tags["id"], tags["name"])))
+    games = model.to_csr()[0].toarray().astype(np.float64)
+
+    rng = np.random.default_rng(seed)
+    libraries = [rng.choice(len(games), size=rng.integers(3, 30), replace=False) for _ in range(n_users)]
+    users = np.stack([games[library].mean(axis=0) for library in libraries])
+    normalize = lambda matrix: matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    return normalize(users), normalize(games)
+
+
+def compare(name: str, users: np.ndarray, games: np.ndarray, k: int):
+    exact = games @ users.T
+    print(f"\n{name}: {len(games)} games x {games.shape[1]} dims, {len(users)} users")
+    print(f"{'precision':<10} {'game MB':>9} {'score ms':>9} {f'recall@{k}':>10}")
+    for precision in PRECISIONS:
+        game_profiles = QuantizedVectors.quantize(games, precision)
+        user_profiles = QuantizedVectors.quantize(users, precision)
+        start = time.perf_counter()
+        approx = game_profiles.dot(user_profiles.dequantize().T)
+        elapsed = time.perf_counter() - start
+        print(f"{precision:<10} {game_profiles.nbytes / 1e6:>9.2f} {elapsed * 1000:>9.1f} "
+              f"{recall_at_k(exact, approx, k):>10.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark quantized profile vectors")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--factors", type=int, default=32)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    compare("als", *als_profiles(args.users, args.games, args.factors), args.k)
+    compare("tags", *tag_profiles(args.users), args.k)
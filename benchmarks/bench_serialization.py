@@ -0,0 +1,139 @@
+"""
+Benchmark per-row serialization cost of list endpoints.
+
+Compares the original path (load ORM objects, GameModel.from_orm per row, FastAPI's
+jsonable_encoder + JSONResponse) with the fast path in src/serialization.py (select
+column tuples, encode with orjson). For games both outputs are checked to be byte-identical.
+
+Float-bearing rows (user_recommendations, game_similarity) are checked separately with
+similarity scores from 1e-12 to 1e20. They decode to the same values, but orjson spells
+some floats differently from the json module behind JSONResponse: 1e-05 becomes 0.00001
+and 1e+16 becomes 1e16. The bytes of those routes are therefore not identical; the
+benchmark prints each spelling that differs.
+
+Games are copied from Data/steam_games.csv into an in-memory SQLite database and
+repeated until the requested row count is reached.
+
+Usage (from the project root):
+    python benchmarks/bench_serialization.py --rows 5000
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import uuid
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from src.models import (Base, Game, GameModel, GameSimilarity, GameSimilarityModel, UserRecommendation,
+                        UserRecommendationModel)
+from src.serialization import iter_json_array, model_field_names, select_model_columns
+
+
+def seed_games(session_factory, n_rows: int):
+    """Insert n_rows games built from the bundled CSV"""
+    games_df = pd.read_csv(os.path.join(PROJECT_ROOT, "Data", "steam_games.csv"))
+    games_df = games_df.astype(object).where(games_df.notna(), None)
+    records = games_df.to_dict("records")
+    rows = []
+    for i in range(n_rows):
+        row = dict(records[i % len(records)])
+        row["id"] = uuid.uuid4()
+        row["appid"] = str(i)
+        row["is_free"] = str(row["is_free"]) == "True"
+        rows.append(row)
+    with session_factory() as db:
+        db.execute(insert(Game), rows)
+        db.commit()
+
+
+# Similarity scores at the edges of the float formats (tiny ALS scores, huge dot products)
+EDGE_FLOATS = [0.0, 1.0, 0.5, 0.1, 1e-05, 1.5e-05, 1e-07, 1.2345678901234567e-07, 1e-12, 0.0001,
+               1e15, 1e16, 1.2345678901234568e20, 123456.789]
+
+
+SIMILARITY_PATTERN = re.compile(rb'"similarity":([^,}]+)')
+
+
+def seed_float_rows(session_factory):
+    """One user_recommendations and one game_similarity row per edge float"""
+    with session_factory() as db:
+        db.execute(insert(UserRecommendation), [
+            {"id": uuid.uuid4(), "username": "user", "appid": str(i), "similarity": value}
+            for i, value in enumerate(EDGE_FLOATS)])
+        db.execute(insert(GameSimilarity), [
+            {"id": uuid.uuid4(), "game1": "game", "game2": str(i), "similarity": value}
+            for i, value in enumerate(EDGE_FLOATS)])
+        db.commit()
+
+
+def orm_path(session_factory, orm_class=Game, pydantic_model=GameModel) -> bytes:
+    with session_factory() as db:
+        products = db.query(orm_class).all()
+        models = [pydantic_model.from_orm(product) for product in products]
+        return JSONResponse(jsonable_encoder(models)).body
+
+
+def fast_path(session_factory, orm_class=Game, pydantic_model=GameModel) -> bytes:
+    with session_factory() as db:
+        result = db.execute(select_model_columns(orm_class, pydantic_model).execution_options(yield_per=1000))
+        return b"".join(iter_json_array(model_field_names(pydantic_model), result.partitions()))
+
+
+def compare_float_rows(session_factory, orm_class, pydantic_model) -> list[tuple[str, str]]:
+    """Check both paths decode to the same rows, returning the (old, new) float spellings that differ"""
+    old = orm_path(session_factory, orm_class, pydantic_model)
+    new = fast_path(session_factory, orm_class, pydantic_model)
+    if json.loads(old) != json.loads(new):
+        raise SystemExit(f"❌ fast path {orm_class.__tablename__} rows decode to different values")
+    spellings = zip(SIMILARITY_PATTERN.findall(old), SIMILARITY_PATTERN.findall(new))
+    return [(old_spelling.decode(), new_spelling.decode()) for old_spelling, new_spelling in spellings
+            if old_spelling != new_spelling]
+
+
+def time_path(path, session_factory, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        path(session_factory)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint serialization")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    seed_games(session_factory, args.rows)
+
+    if orm_path(session_factory) != fast_path(session_factory):
+        raise SystemExit("❌ fast path output differs from the GameModel.from_orm output")
+    print("✅ fast path output is byte-identical to the GameModel.from_orm output")
+
+    seed_float_rows(session_factory)
+    for orm_class, pydantic_model in [(UserRecommendation, UserRecommendationModel),
+                                      (GameSimilarity, GameSimilarityModel)]:
+        differences = compare_float_rows(session_factory, orm_class, pydantic_model)
+        print(f"✅ {orm_class.__tablename__}: same values, {len(differences)} of {len(EDGE_FLOATS)} "
+              f"similarity spellings differ" + "".join(f"\n     {old} -> {new}" for old, new in differences))
+
+    orm_seconds = time_path(orm_path, session_factory, args.repeats)
+    fast_seconds = time_path(fast_path, session_factory, args.repeats)
+    print(f"from_orm path: {orm_seconds * 1e6 / args.rows:8.1f} us/row ({orm_seconds * 1000:.1f} ms total)")
+    print(f"fast path:     {fast_seconds * 1e6 / args.rows:8.1f} us/row ({fast_seconds * 1000:.1f} ms total)")
+    print(f"speedup:       {orm_seconds / fast_seconds:8.1f}x")
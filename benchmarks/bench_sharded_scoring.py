@@ -0,0 +1,108 @@
+"""
+Measure the speedup of sharded multi-process scoring on a full-Steam-sized catalog.
+
+Builds a synthetic catalog model of --games games whose tags follow the tag frequencies
+and tags-per-game distribution of Data/, and mean-of-library user vectors for --users
+users. Scoring every user against every game is timed:
+    in_process - CatalogModel.top_n per user, the single-process path
+    kernel     - the shard kernel over the whole matrix in one process (the 1x baseline)
+    sharded    - ShardedScorer over N worker processes and N shards in shared memory
+
+For each worker count it reports the batch time, users/s, the speedup and parallel
+efficiency against the kernel baseline, the latency of a single user, and whether the
+merged top-k scores match the single-process ones. Speedup is bounded by the physical
+cores of the machine, worker counts above os.cpu_count() are still run but flagged.
+
+Usage (from the project root):
+    python benchmarks/bench_sharded_scoring.py --games 200000 --users 64 --workers 1 2 4 8
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from src.catalog_model import CatalogModel
+from src.sharded_scoring import ShardedScorer, normalize_rows, score_top_k
+
+
+def synthetic_catalog(n_games: int, seed: int = 0) -> CatalogModel:
+    """Catalog model with n_games games tagged like the games in Data/"""
+    tags = pd.read_csv(os.path.join(PROJECT_ROOT, "Data", "steam_tags.csv"))
+    game_tags = pd.read_csv(os.path.join(PROJECT_ROOT, "Data", "steam_game_tags.csv"), dtype={"appid": str})
+    tag_frequency = game_tags["tag_id"].value_counts()
+    tags_per_game = game_tags.groupby("appid").size().to_numpy()
+
+    rng = np.random.default_rng(seed)
+    counts = np.minimum(rng.choice(tags_per_game, size=n_games), len(tag_frequency))
+    probabilities = (tag_frequency / tag_frequency.sum()).to_numpy()
+    tag_ids = [rng.choice(tag_frequency.index.to_numpy(), size=count, replace=False, p=probabilities)
+               for count in counts]
+    appids = np.repeat(np.arange(n_games).astype(str), counts)
+    return CatalogModel.from_id_pairs(appids, np.concatenate(tag_ids), dict(zip(tags["id"], tags["name"])))
+
+
+def user_vectors(model: CatalogModel, n_users: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    appids = list(model.rows)
+    libraries = [rng.choice(len(appids), size=rng.integers(3, 60), replace=False) for _ in range(n_users)]
+    return np.stack([model.user_vector(appids[i] for i in library) for library in libraries])
+
+
+def timed(fn, repeats: int) -> tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sharded multi-process catalog scoring")
+    parser.add_argument("--games", type=int, default=200000, help="Catalog size (the Steam app list is ~200k)")
+    parser.add_argument("--users", type=int, default=64, help="Users scored per batch")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = synthetic_catalog(args.games)
+    users = user_vectors(model, args.users)
+    matrix, appids = model.to_csr()
+    normalized = normalize_rows(matrix)
+    print(f"catalog: {len(model)} games x {len(model.tag_ids)} tags, {matrix.nnz} tags set, "
+          f"{args.users} users, k={args.k} (built in {time.perf_counter() - start:.1f}s), "
+          f"{os.cpu_count()} CPUs")
+
+    in_process, _ = timed(lambda: [model.top_n(user, args.k) for user in users], args.repeats)
+    kernel, (_, expected) = timed(lambda: score_top_k(normalized, users, args.k), args.repeats)
+    expected = -np.sort(-expected, axis=0)
+
+    print(f"\n{'method':<10} {'workers':>7} {'batch s':>8} {'users/s':>9} {'speedup':>8} {'efficiency':>10} "
+          f"{'1-user ms':>9} {'match':>6}")
+    print(f"{'in_process':<10} {1:>7} {in_process:>8.3f} {args.users / in_process:>9.1f} "
+          f"{kernel / in_process:>7.2f}x {'':>10} {1000 * in_process / args.users:>9.1f} {'':>6}")
+    print(f"{'kernel':<10} {1:>7} {kernel:>8.3f} {args.users / kernel:>9.1f} {1.0:>7.2f}x {'100%':>10} "
+          f"{'':>9} {'':>6}")
+    for workers in args.workers:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor:
+            scorer = ShardedScorer(matrix, appids, model.base_id, executor, n_shards=workers)
+            try:
+                scorer.top_k_rows(users, args.k)      # start the workers and map the shards
+                batch, (_, scores) = timed(lambda: scorer.top_k_rows(users, args.k), args.repeats)
+                single, _ = timed(lambda: scorer.top_n(users[0], args.k), args.repeats)
+            finally:
+                scorer.close()
+        match = np.allclose(scores, expected, atol=1e-6)
+        note = "  (more workers than CPUs)" if workers > (os.cpu_count() or 1) else ""
+        print(f"{'sharded':<10} {workers:>7} {batch:>8.3f} {args.users / batch:>9.1f} {kernel / batch:>7.2f}x "
+              f"{kernel / batch / workers:>10.0%} {1000 * single:>9.1f} {str(match):>6}{note}")
@@ -0,0 +1,97 @@
+"""
+Benchmark the cold start of the FastAPI app.
+
+Measures two things, each in a fresh interpreter so nothing is cached:
+    1. How long `import src.main` takes and which heavy modules it pulls in
+    2. How long uvicorn takes from process start until "/" answers
+
+Usage (from the project root):
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be loaded once a recommendation job runs
+HEAVY_MODULES = ["pandas", "sklearn", "scipy", "sqlmodel"]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import src.main
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy_modules": heavy}}))
+"""
+
+
+def _env():
+    env = os.environ.copy()
+    env["PYTHONPATH"] = PROJECT_ROOT
+    # create_engine needs a URL, but nothing connects during import
+    env.setdefault("Internal_Database_Url", "sqlite://")
+    return env
+
+
+def measure_import(runs: int) -> dict:
+    """Time `import src.main` in fresh interpreters"""
+    timings = []
+    heavy = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(heavy=HEAVY_MODULES)],
+            cwd=PROJECT_ROOT, env=_env(), capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        heavy = result["heavy_modules"]
+    return {"median": statistics.median(timings), "min": min(timings), "heavy_modules": heavy}
+
+
+def measure_boot(runs: int, port: int) -> dict:
+    """Time from launching uvicorn until GET / returns 200"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=PROJECT_ROOT, env=_env(),
+        )
+        try:
+            while True:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                        if response.status == 200:
+                            break
+                except OSError:
+                    if server.poll() is not None:
+                        raise RuntimeError("uvicorn exited before serving /")
+                    time.sleep(0.01)
+            timings.append(time.perf_counter() - start)
+        finally:
+            server.terminate()
+            server.wait()
+    return {"median": statistics.median(timings), "min": min(timings)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure app import and boot time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--skip-boot", action="store_true", help="Only measure import time")
+    args = parser.parse_args()
+
+    import_result = measure_import(args.runs)
+    print(f"import src.main: median {import_result['median'] * 1000:.1f} ms, min {import_result['min'] * 1000:.1f} ms")
+    print(f"heavy modules loaded at import: {import_result['heavy_modules'] or 'none'}")
+
+    if not args.skip_boot:
+        boot_result = measure_boot(args.runs, args.port)
+        print(f"boot to first response: median {boot_result['median'] * 1000:.1f} ms, min {boot_result['min'] * 1000:.1f} ms")
@@ -0,0 +1,55 @@
+"""
+Benchmark faceted browsing on the tag bitmap index at full Steam catalog size.
+
+Tags are assigned with a Zipf-like skew so a few tags (Single-player, Steam
+Achievements...) cover most games, as they do in the real game_tags table.
+
+Usage (from the project root):
+    python benchmarks/bench_tag_index.py --games 150000 --tags 450
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.tag_index import TagBitmapIndex
+
+
+def synthetic_pairs(n_games: int, n_tags: int, tags_per_game: int, seed: int = 0):
+    """(appid, tag) pairs with popular tags shared by many games"""
+    rng = random.Random(seed)
+    tags = [f"tag_{i}" for i in range(n_tags)]
+    weights = [1.0 / (i + 1) for i in range(n_tags)]
+    for appid in range(n_games):
+        for tag in set(rng.choices(tags, weights=weights, k=tags_per_game)):
+            yield str(appid), tag
+
+
+def time_query(index: TagBitmapIndex, tags: list, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        index.browse(tags, offset=0, limit=50)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tag facet queries")
+    parser.add_argument("--games", type=int, default=150_000)
+    parser.add_argument("--tags", type=int, default=450)
+    parser.add_argument("--tags-per-game", type=int, default=12)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = TagBitmapIndex().build(synthetic_pairs(args.games, args.tags, args.tags_per_game))
+    build_seconds = time.perf_counter() - start
+    memory_mb = sum(bitmap.bit_length() for bitmap in index.bitmaps.values()) / 8 / 1e6
+    print(f"built index over {len(index)} games / {len(index.bitmaps)} tags in {build_seconds:.2f} s ({memory_mb:.1f} MB of bitmaps)")
+
+    for tags in ([], ["tag_0"], ["tag_0", "tag_1"], ["tag_0", "tag_1", "tag_5"], ["tag_200", "tag_300"]):
+        print(f"browse {tags or 'all games'}: {time_query(index, tags, args.repeats) * 1000:.2f} ms")
@@ -0,0 +1,152 @@
+"""
+Compare the legacy text game_tags table with the integer-encoded tags/game_tags tables.
+
+Both layouts are loaded with the same (appid, tag) pairs, derived from Data/ and scaled
+up to --games by giving real tag sets to synthetic appids. For each layout it reports:
+    1. Table + index storage (SQLite file size after VACUUM, or pg_total_relation_size)
+    2. Time to read the rows back and build the catalog model from them
+
+Usage (from the project root):
+    python benchmarks/bench_tag_storage.py --games 150000
+    python benchmarks/bench_tag_storage.py --games 150000 --database-url postgresql://...   # scratch database
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from src.catalog_model import CatalogModel, load_catalog_model
+from src.tag_dictionary import encode_tags
+
+LEGACY_DDL = """CREATE TABLE legacy_game_tags (
+    id VARCHAR(36) PRIMARY KEY,
+    appid VARCHAR(255) NOT NULL,
+    category VARCHAR(255) NOT NULL
+    )
+    """
+TAGS_DDL = """CREATE TABLE tags (
+    id SMALLINT PRIMARY KEY,
+    name VARCHAR(255) UNIQUE NOT NULL
+    )
+    """
+GAME_TAGS_DDL = """CREATE TABLE game_tags (
+    appid VARCHAR(255) NOT NULL,
+    tag_id SMALLINT NOT NULL REFERENCES tags (id),
+    PRIMARY KEY (appid, tag_id)
+    )
+    """
+
+
+def scaled_pairs(n_games: int, seed: int = 0) -> pd.DataFrame:
+    """(appid, category) rows for n_games, reusing the tag sets of the games in Data/"""
+    tags = pd.read_csv(os.path.join(PROJECT_ROOT, "Data", "steam_tags.csv"))
+    game_tags = pd.read_csv(os.path.join(PROJECT_ROOT, "Data", "steam_game_tags.csv"), dtype={"appid": str})
+    names = dict(zip(tags["id"], tags["name"]))
+    tag_sets = [[names[tag_id] for tag_id in group] for _, group in game_tags.groupby("appid")["tag_id"]]
+
+    rng = random.Random(seed)
+    rows = [(str(appid), tag) for appid in range(n_games) for tag in rng.choice(tag_sets)]
+    return pd.DataFrame(rows, columns=["appid", "category"])
+
+
+def load_layouts(engine, pairs: pd.DataFrame):
+    """Create and fill both layouts"""
+    with engine.begin() as conn:
+        for table in ("legacy_game_tags", "game_tags", "tags"):
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(text(LEGACY_DDL))
+        conn.execute(text(TAGS_DDL))
+        conn.execute(text(GAME_TAGS_DDL))
+    legacy = pairs.assign(id=[str(uuid.uuid4()) for _ in range(len(pairs))])
+    legacy.to_sql("legacy_game_tags", engine, if_exists="append", index=False, chunksize=10_000)
+    tags_df, game_tags_df = encode_tags(pairs)
+    tags_df.to_sql("tags", engine, if_exists="append", index=False)
+    game_tags_df.to_sql("game_tags", engine, if_exists="append", index=False, chunksize=10_000)
+
+
+def postgres_sizes(engine) -> dict:
+    with engine.connect() as conn:
+        size = lambda table: conn.execute(text(f"SELECT pg_total_relation_size('{table}')")).scalar()
+        return {"legacy": size("legacy_game_tags"), "normalized": size("tags") + size("game_tags")}
+
+
+def sqlite_sizes(pairs: pd.DataFrame, workdir: str) -> dict:
+    """SQLite has no per-table size, so each layout gets its own database file"""
+    sizes = {}
+    for layout, keep in (("legacy", ["legacy_game_tags"]), ("normalized", ["tags", "game_tags"])):
+        path = os.path.join(workdir, f"{layout}.sqlite")
+        engine = create_engine(f"sqlite:///{path}")
+        load_layouts(engine, pairs)
+        with engine.begin() as conn:
+            for table in {"legacy_game_tags", "tags", "game_tags"} - set(keep):
+                conn.execute(text(f"DROP TABLE {table}"))
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        engine.dispose()
+        sizes[layout] = os.path.getsize(path)
+    return sizes
+
+
+def time_builds(engine, repeats: int) -> dict:
+    """Median time to fetch rows and build the catalog model for each layout"""
+    def legacy_build():
+        with Session(engine) as db:
+            rows = db.execute(text("SELECT appid, category FROM legacy_game_tags")).all()
+            return CatalogModel.from_pairs(rows)
+
+    def normalized_build():
+        with Session(engine) as db:
+            return load_catalog_model(db, 1)
+
+    timings = {}
+    for layout, build in (("legacy", legacy_build), ("normalized", normalized_build)):
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model = build()
+            samples.append(time.perf_counter() - start)
+        timings[layout] = (statistics.median(samples), len(model), len(model.tag_ids))
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark text vs integer-encoded tag storage")
+    parser.add_argument("--games", type=int, default=150_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--database-url", help="Scratch PostgreSQL database to measure instead of SQLite")
+    args = parser.parse_args()
+
+    pairs = scaled_pairs(args.games)
+    print(f"{len(pairs)} (appid, tag) rows over {args.games} games and {pairs['category'].nunique()} tags")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.database_url:
+            engine = create_engine(args.database_url)
+            load_layouts(engine, pairs)
+            with engine.connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM ANALYZE"))
+            sizes = postgres_sizes(engine)
+        else:
+            sizes = sqlite_sizes(pairs, workdir)
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, 'both.sqlite')}")
+            load_layouts(engine, pairs)
+
+        timings = time_builds(engine, args.repeats)
+        engine.dispose()
+
+    print(f"\n{'layout':<12} {'storage MB':>11} {'build s':>9} {'games':>8} {'tags':>6}")
+    for layout in ("legacy", "normalized"):
+        seconds, n_games, n_tags = timings[layout]
+        print(f"{layout:<12} {sizes[layout] / 1e6:>11.2f} {seconds:>9.3f} {n_games:>8} {n_tags:>6}")
+    print(f"\nstorage x{sizes['legacy'] / sizes['normalized']:.1f} smaller, "
+          f"build x{timings['legacy'][0] / timings['normalized'][0]:.1f} faster")
@@ -0,0 +1,203 @@
+"""
+Local load-testing harness for the FastAPI app.
+
+Seeds a throwaway SQLite database from the CSVs in Data/ (standing in for the Render
+PostgreSQL instance), starts the app with uvicorn against it and drives a weighted mix
+of requests from concurrent workers:
+
+    GET  /api/v1/games/                    catalog reads
+    GET  /api/v1/user_recommended_game/    recommendation reads
+    POST /api/v1/user_game/                library writes, each triggering a recompute
+
+At the end it reports throughput and p50/p95/p99 latency per route.
+
+Usage (from the project root):
+    python benchmarks/load_test.py --concurrency 16 --duration 30
+    python benchmarks/load_test.py --url http://localhost:8000 --duration 30   # existing server
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "Data")
+sys.path.insert(0, PROJECT_ROOT)
+from src.utils.sample_data import seed_database
+
+# Route name -> default share of the request mix
+DEFAULT_MIX = {
+    "games": 0.6,
+    "user_recommended_game": 0.3,
+    "user_game_write": 0.1,
+}
+
+
+def start_server(database_url: str, port: int) -> subprocess.Popen:
+    """Start uvicorn against the seeded database and wait until "/" answers"""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = PROJECT_ROOT
+    env["Internal_Database_Url"] = database_url
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before serving /")
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start within 30 seconds")
+
+
+class LoadWorker(threading.Thread):
+    """Sends requests over one keep-alive connection until the deadline passes"""
+
+    def __init__(self, worker_id: int, host: str, port: int, mix: dict, catalog: dict, deadline: float, results: list):
+        super().__init__(daemon=True)
+        self.worker_id = worker_id
+        self.host = host
+        self.port = port
+        self.routes = list(mix)
+        self.weights = list(mix.values())
+        self.catalog = catalog
+        self.deadline = deadline
+        self.results = results
+        self.rng = random.Random(worker_id)
+        self.writes = 0
+
+    def build_request(self, route: str) -> tuple[str, str, bytes]:
+        if route == "games":
+            return "GET", "/api/v1/games/", b""
+        if route == "user_recommended_game":
+            query = urllib.parse.urlencode({"username": self.rng.choice(self.catalog["usernames"])})
+            return "GET", f"/api/v1/user_recommended_game/?{query}", b""
+        # a fresh username per write so every POST inserts instead of hitting the duplicate check
+        self.writes += 1
+        body = {
+            "username": f"load_user_{self.worker_id}_{self.writes}",
+            "appid": self.rng.choice(self.catalog["appids"]),
+            "shelf": "played",
+            "rating": float(self.rng.randint(1, 5)),
+        }
+        return "POST", "/api/v1/user_game/", json.dumps(body).encode()
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        while time.monotonic() < self.deadline:
+            route = self.rng.choices(self.routes, weights=self.weights)[0]
+            method, path, body = self.build_request(route)
+            headers = {"Content-Type": "application/json"} if body else {}
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body or None, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.results.append((route, time.perf_counter() - start, ok))
+        conn.close()
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def report(results: list, elapsed: float):
+    """Print throughput and latency percentiles per route"""
+    by_route = defaultdict(list)
+    errors = defaultdict(int)
+    for route, latency, ok in results:
+        by_route[route].append(latency)
+        if not ok:
+            errors[route] += 1
+
+    print(f"\n{'route':<24} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route in sorted(by_route):
+        latencies = sorted(by_route[route])
+        print(f"{route:<24} {len(latencies):>9} {errors[route]:>7} {len(latencies) / elapsed:>8.1f} "
+              f"{percentile(latencies, 0.50) * 1000:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.1f}")
+    all_latencies = sorted(latency for _, latency, _ in results)
+    if all_latencies:
+        print(f"{'total':<24} {len(all_latencies):>9} {sum(errors.values()):>7} {len(all_latencies) / elapsed:>8.1f} "
+              f"{statistics.median(all_latencies) * 1000:>8.1f} {percentile(all_latencies, 0.95) * 1000:>8.1f} "
+              f"{percentile(all_latencies, 0.99) * 1000:>8.1f}")
+
+
+def parse_mix(values: list) -> dict:
+    """Parse route=weight pairs, falling back to the default mix"""
+    mix = dict(DEFAULT_MIX)
+    for value in values or []:
+        route, weight = value.split("=")
+        if route not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown route '{route}', expected one of {list(DEFAULT_MIX)}")
+        mix[route] = float(weight)
+    return {route: weight for route, weight in mix.items() if weight > 0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive a realistic request mix against a local app")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent workers")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--url", help="Target an already running app instead of starting one")
+    parser.add_argument("--mix", nargs="*", metavar="ROUTE=WEIGHT",
+                        help=f"Override request mix weights, routes: {', '.join(DEFAULT_MIX)}")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    server = None
+    workdir = tempfile.TemporaryDirectory()
+    try:
+        if args.url:
+            target = urllib.parse.urlparse(args.url)
+            host, port = target.hostname, target.port or 80
+            import pandas as pd
+            catalog = {
+                "appids": pd.read_csv(os.path.join(DATA_DIR, "steam_games.csv"))["appid"].astype(str).tolist(),
+                "usernames": pd.read_csv(os.path.join(DATA_DIR, "steam_users.csv"))["username"].tolist(),
+            }
+        else:
+            database_url = f"sqlite:///{os.path.join(workdir.name, 'load_test.sqlite')}"
+            print(f"Seeding local database at {database_url}")
+            catalog = seed_database(database_url)
+            server = start_server(database_url, args.port)
+            host, port = "127.0.0.1", args.port
+
+        print(f"Running {args.concurrency} workers for {args.duration:.0f}s with mix {mix}")
+        results = []
+        deadline = time.monotonic() + args.duration
+        start = time.perf_counter()
+        workers = [LoadWorker(i, host, port, mix, catalog, deadline, results) for i in range(args.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        report(results, time.perf_counter() - start)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        workdir.cleanup()
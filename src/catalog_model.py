@@ -0,0 +1,378 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from scipy.sparse import csr_matrix
+from src.recompute_scheduler import get_catalog_version, bump_catalog_version
+from src.tag_dictionary import fetch_tag_dictionary, fetch_tag_id_pairs, get_or_create_tag_ids
+from src.cold_start import refresh_cold_start
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import threading
+import uuid
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CatalogModel:
+    """
+    Game x tag model that accepts small deltas without a full rebuild.
+
+    Rows live in a compacted CSR "base" matrix. Games added or retagged since the last
+    compaction live in an overlay of per-row tag id arrays that shadows the base row,
+    and removed games are tombstoned. Norms are kept per row and updated in place.
+    Once overlay + tombstones exceed compaction_ratio of the live rows, everything is
+    folded back into a fresh base matrix.
+
+    Columns are tag ids. A model loaded from the database uses the ids of the `tags`
+    dictionary table directly, so tag text never has to be re-encoded on a build.
+    """
+
+    def __init__(self, version: int = 1, compaction_ratio: float = 0.2):
+        self.version = version
+        self.compaction_ratio = compaction_ratio
+        self.tags: List[Optional[str]] = []       # tag id -> tag (None for unused ids)
+        self.tag_ids: Dict[str, int] = {}         # tag -> tag id
+        self.appids: List[Optional[str]] = []     # row -> appid (None once removed)
+        self.rows: Dict[str, int] = {}            # appid -> row
+        self._base = csr_matrix((0, 0), dtype=np.float32)
+        self._overlay: Dict[int, np.ndarray] = {}
+        self._overlay_csr = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._tombstones = 0
+        self.base_id = uuid.uuid4().hex           # changes whenever the base matrix is replaced
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def _from_csr(cls, matrix: csr_matrix, appids: List[str], tags: List[Optional[str]], version: int,
+                  compaction_ratio: float) -> "CatalogModel":
+        model = cls(version, compaction_ratio)
+        model.tags = list(tags)
+        model.tag_ids = {tag: i for i, tag in enumerate(model.tags) if tag is not None}
+        model.appids = list(appids)
+        model.rows = {appid: i for i, appid in enumerate(model.appids)}
+        model._base = matrix
+        model._alive = np.ones(len(model.appids), dtype=bool)
+        model._norms = np.sqrt(np.diff(matrix.indptr)).astype(np.float32)
+        return model
+
+    @classmethod
+    def from_id_pairs(cls, appids: np.ndarray, tag_ids: np.ndarray, dictionary: Dict[int, str],
+                      version: int = 1, compaction_ratio: float = 0.2) -> "CatalogModel":
+        """Build a model from parallel appid / tag id arrays (the game_tags table) and the tag dictionary"""
+        tags: List[Optional[str]] = [None] * (max(dictionary, default=-1) + 1)
+        for tag_id, name in dictionary.items():
+            tags[tag_id] = name
+        unique_appids, rows = np.unique(np.asarray(appids).astype(str), return_inverse=True)
+        matrix = csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, np.asarray(tag_ids, dtype=np.int64))),
+                            shape=(len(unique_appids), len(tags)))
+        matrix.sum_duplicates()
+        matrix.data[:] = 1.0
+        return cls._from_csr(matrix, unique_appids.tolist(), tags, version, compaction_ratio)
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple[str, str]], version: int = 1, compaction_ratio: float = 0.2) -> "CatalogModel":
+        """Build a model from (appid, tag) text pairs, numbering tags alphabetically"""
+        pairs = [(str(appid), tag) for appid, tag in pairs]
+        names = sorted({tag for _, tag in pairs})
+        tag_ids = {tag: i for i, tag in enumerate(names)}
+        appids = np.array([appid for appid, _ in pairs], dtype=str)
+        ids = np.fromiter((tag_ids[tag] for _, tag in pairs), dtype=np.int64, count=len(pairs))
+        return cls.from_id_pairs(appids, ids, dict(enumerate(names)), version, compaction_ratio)
+
+    #-------------------------------------------------#
+    # ----------DELTAS--------------------------------#
+    #-------------------------------------------------#
+
+    def _tag_id(self, tag: str) -> int:
+        if tag not in self.tag_ids:
+            self.tag_ids[tag] = len(self.tags)
+            self.tags.append(tag)
+        return self.tag_ids[tag]
+
+    def register_tags(self, dictionary: Dict[int, str]):
+        """Adopt tag ids assigned by the dictionary table before applying deltas that use them"""
+        with self._lock:
+            for tag_id, name in dictionary.items():
+                if name in self.tag_ids:
+                    continue
+                if tag_id >= len(self.tags):
+                    self.tags.extend([None] * (tag_id + 1 - len(self.tags)))
+                self.tags[tag_id] = name
+                self.tag_ids[name] = tag_id
+
+    def _row_tag_ids(self, row: int) -> np.ndarray:
+        if row in self._overlay:
+            return self._overlay[row]
+        if row < self._base.shape[0]:
+            return self._base.indices[self._base.indptr[row]:self._base.indptr[row + 1]]
+        return np.zeros(0, dtype=np.int64)
+
+    def _set_row(self, row: int, tag_ids: np.ndarray):
+        self._overlay[row] = np.unique(tag_ids).astype(np.int64)
+        self._norms[row] = np.sqrt(len(self._overlay[row]))
+        self._overlay_csr = None
+
+    def game_tags(self, appid: str) -> List[str]:
+        """Current tags of a game"""
+        row = self.rows.get(appid)
+        return [] if row is None else [self.tags[i] for i in self._row_tag_ids(row)]
+
+    def add_game(self, appid: str, tags: Iterable[str]):
+        """Add a game, or replace the tags of an existing one"""
+        with self._lock:
+            tag_ids = np.array([self._tag_id(tag) for tag in tags], dtype=np.int64)
+            row = self.rows.get(appid)
+            if row is None:
+                row = len(self.appids)
+                self.appids.append(appid)
+                self.rows[appid] = row
+                if row >= len(self._alive):
+                    # grow by doubling so a stream of single-game adds stays amortized O(1)
+                    capacity = max(16, 2 * len(self._alive))
+                    self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+                    self._norms = np.concatenate([self._norms, np.zeros(capacity - len(self._norms), dtype=np.float32)])
+                self._alive[row] = True
+            self._set_row(row, tag_ids)
+            self._maybe_compact()
+
+    def remove_game(self, appid: str):
+        """Tombstone a game so it is no longer scored"""
+        with self._lock:
+            row = self.rows.pop(appid, None)
+            if row is None:
+                return
+            self.appids[row] = None
+            self._alive[row] = False
+            self._norms[row] = 0.0
+            if self._overlay.pop(row, None) is not None:
+                self._overlay_csr = None
+            self._tombstones += 1
+            self._maybe_compact()
+
+    def add_tags(self, appid: str, tags: Iterable[str]):
+        """Add tags to an existing game (a missing game is created)"""
+        with self._lock:
+            if appid not in self.rows:
+                self.add_game(appid, tags)
+                return
+            row = self.rows[appid]
+            new_ids = np.array([self._tag_id(tag) for tag in tags], dtype=np.int64)
+            self._set_row(row, np.concatenate([self._row_tag_ids(row), new_ids]))
+            self._maybe_compact()
+
+    def remove_tags(self, appid: str, tags: Iterable[str]):
+        """Remove tags from an existing game"""
+        with self._lock:
+            row = self.rows.get(appid)
+            if row is None:
+                return
+            drop = [self.tag_ids[tag] for tag in tags if tag in self.tag_ids]
+            current = self._row_tag_ids(row)
+            self._set_row(row, current[~np.isin(current, drop)])
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        pending = len(self._overlay) + self._tombstones
+        if pending > self.compaction_ratio * max(len(self.rows), 1):
+            self.compact()
+
+    def compact(self):
+        """Fold overlay rows and tombstones into a fresh base matrix, keeping tag ids stable"""
+        with self._lock:
+            matrix, appids = self.to_csr()
+            compacted = CatalogModel._from_csr(matrix, appids, self.tags, self.version, self.compaction_ratio)
+            self.__dict__.update({key: value for key, value in compacted.__dict__.items() if key != "_lock"})
+            logger.info(f"Compacted catalog model: {len(self.rows)} games, {len(self.tags)} tags")
+
+    #-------------------------------------------------#
+    # ----------SCORING-------------------------------#
+    #-------------------------------------------------#
+
+    def _overlay_matrix(self) -> tuple[np.ndarray, csr_matrix]:
+        """Overlay rows as (row numbers, csr matrix), cached until the next delta"""
+        if self._overlay_csr is None:
+            rows = np.array(sorted(self._overlay), dtype=np.int64)
+            arrays = [self._overlay[row] for row in rows]
+            indptr = np.concatenate([[0], np.cumsum([len(a) for a in arrays])]).astype(np.int64)
+            indices = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+            matrix = csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                                shape=(len(rows), len(self.tags)))
+            self._overlay_csr = (rows, matrix)
+        return self._overlay_csr
+
+    def row_vectors(self, rows: List[int]) -> np.ndarray:
+        """Dense tag vectors for the given rows"""
+        vectors = np.zeros((len(rows), len(self.tags)), dtype=np.float32)
+        for i, row in enumerate(rows):
+            vectors[i, self._row_tag_ids(row)] = 1.0
+        return vectors
+
+    def user_vector(self, appids: Iterable[str]) -> Optional[np.ndarray]:
+        """Mean tag vector of the user's games that exist in the catalog (None if there are none)"""
+        with self._lock:
+            rows = [self.rows[appid] for appid in appids if appid in self.rows]
+            if not rows:
+                return None
+            return self.row_vectors(rows).mean(axis=0)
+
+    def scores(self, user_vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of user_vector with every row (removed rows score -inf)"""
+        with self._lock:
+            dots = np.zeros(len(self.appids), dtype=np.float32)
+            base_rows, base_cols = self._base.shape
+            if base_rows:
+                dots[:base_rows] = self._base @ user_vector[:base_cols]
+            overlay_rows, overlay = self._overlay_matrix()
+            if len(overlay_rows):
+                dots[overlay_rows] = overlay @ user_vector[:overlay.shape[1]]
+
+            n_rows = len(self.appids)
+            denominator = self._norms[:n_rows] * np.float32(np.linalg.norm(user_vector))
+            scores = np.divide(dots, denominator, out=np.zeros_like(dots), where=denominator > 0)
+            scores[~self._alive[:n_rows]] = -np.inf
+            return scores
+
+    def top_n(self, user_vector: np.ndarray, n: int = 20) -> List[tuple[str, float]]:
+        """The n live games most similar to user_vector as (appid, score) pairs"""
+        scores = self.scores(user_vector)
+        n = min(n, len(self.rows))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.appids[row], float(scores[row])) for row in top]
+
+    def base_csr(self) -> tuple[csr_matrix, List[Optional[str]], str]:
+        """The compacted base matrix, the appids of its rows and its base_id (rows keep their numbers until compaction)"""
+        with self._lock:
+            return self._base, list(self.appids[:self._base.shape[0]]), self.base_id
+
+    def pending_top_n(self, user_vector: np.ndarray, n: int = 20) -> tuple[str, np.ndarray, List[tuple[str, float]]]:
+        """
+        What a copy of the base matrix is missing since the last compaction.
+
+        Returns:
+            (base_id, base rows that were removed or are shadowed by the overlay, the n
+            overlay rows most similar to user_vector as (appid, score) pairs)
+        """
+        with self._lock:
+            base_rows = self._base.shape[0]
+            overlay_rows, overlay = self._overlay_matrix()
+            excluded = np.union1d(np.flatnonzero(~self._alive[:base_rows]), overlay_rows[overlay_rows < base_rows])
+            n = min(n, len(overlay_rows))
+            if n <= 0:
+                return self.base_id, excluded, []
+            dots = overlay @ user_vector[:overlay.shape[1]]
+            denominator = self._norms[overlay_rows] * np.float32(np.linalg.norm(user_vector))
+            scores = np.divide(dots, denominator, out=np.zeros_like(dots), where=denominator > 0)
+            top = np.argpartition(-scores, n - 1)[:n]
+            return self.base_id, excluded, [(self.appids[overlay_rows[i]], float(scores[i])) for i in top]
+
+    def to_csr(self) -> tuple[csr_matrix, List[str]]:
+        """Live rows as one CSR matrix plus their appids, e.g. to blend with other features"""
+        with self._lock:
+            live = list(self.rows.items())
+            arrays = [self._row_tag_ids(row) for _, row in live]
+            indptr = np.concatenate([[0], np.cumsum([len(a) for a in arrays])]).astype(np.int64)
+            indices = np.concatenate(arrays).astype(np.int64) if arrays else np.zeros(0, dtype=np.int64)
+            matrix = csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                                shape=(len(live), len(self.tags)))
+            return matrix, [appid for appid, _ in live]
+
+
+#-------------------------------------------------#
+# ----------PROCESS-WIDE MODEL--------------------#
+#-------------------------------------------------#
+
+_model: Optional[CatalogModel] = None
+_model_lock = threading.Lock()
+
+
+def load_catalog_model(db: Session, version: int) -> CatalogModel:
+    """Build the model straight from the integer game_tags rows and the tag dictionary"""
+    appids, tag_ids = fetch_tag_id_pairs(db)
+    return CatalogModel.from_id_pairs(appids, tag_ids, fetch_tag_dictionary(db), version)
+
+
+def get_catalog_model(db: Session) -> CatalogModel:
+    """Shared catalog model, fully rebuilt only when the catalog version moved past it"""
+    global _model
+    version = get_catalog_version(db)
+    with _model_lock:
+        if _model is None or _model.version != version:
+            _model = load_catalog_model(db, version)
+            logger.info(f"Loaded catalog model version {version}: {len(_model)} games, {len(_model.tag_ids)} tags")
+        model = _model
+    # the cold-start ranking is bucketed by the model's tags, so it follows the model's version
+    refresh_cold_start(db, model)
+    return model
+
+
+def apply_catalog_delta(db: Session, added_games: Dict[str, List[str]] = None, removed_games: List[str] = None,
+                        added_tags: Dict[str, List[str]] = None, removed_tags: Dict[str, List[str]] = None) -> int:
+    """
+    Persist a small catalog change to tags/game_tags and apply it to the in-memory model.
+
+    Args:
+        added_games: appid -> tags for new (or fully retagged) games
+        removed_games: appids to remove
+        added_tags: appid -> tags to add to an existing game
+        removed_tags: appid -> tags to remove from an existing game
+
+    Returns:
+        int: The new catalog version
+    """
+    added_games, removed_games = added_games or {}, removed_games or []
+    added_tags, removed_tags = added_tags or {}, removed_tags or {}
+    model = get_catalog_model(db)
+
+    # Final tag set of every touched game (None once removed), applied in the order
+    # added_games, removed_games, added_tags, removed_tags, so the same appid may
+    # appear in several parts and game_tags and the model still end up identical
+    final: Dict[str, Optional[set]] = {}
+
+    def current_tags(appid: str) -> Optional[set]:
+        if appid in final:
+            return final[appid]
+        return set(model.game_tags(appid)) if appid in model.rows else None
+
+    for appid, tags in added_games.items():
+        final[appid] = set(tags)
+    for appid in removed_games:
+        final[appid] = None
+    for appid, tags in added_tags.items():
+        final[appid] = (current_tags(appid) or set()) | set(tags)
+    for appid, tags in removed_tags.items():
+        tags_now = current_tags(appid)
+        if tags_now is not None:
+            final[appid] = tags_now - set(tags)
+
+    tag_ids = get_or_create_tag_ids(db, [tag for tags in final.values() if tags for tag in tags])
+
+    delete = text("DELETE FROM game_tags WHERE appid = :appid")
+    insert = text("INSERT INTO game_tags (appid, tag_id) VALUES (:appid, :tag_id)")
+    for appid in final:
+        db.execute(delete, {"appid": appid})
+    new_rows = [{"appid": appid, "tag_id": tag_ids[tag]} for appid, tags in final.items() if tags for tag in tags]
+    if new_rows:
+        db.execute(insert, new_rows)
+    version = bump_catalog_version(db)
+
+    with _model_lock:
+        model.register_tags({tag_id: name for name, tag_id in tag_ids.items()})
+        for appid, tags in final.items():
+            if tags is None:
+                model.remove_game(appid)
+            else:
+                model.add_game(appid, sorted(tags))
+        # the model already reflects this change, so the version bump must not trigger a rebuild
+        if model.version == version - 1:
+            model.version = version
+    refresh_cold_start(db, model)
+    return version
@@ -0,0 +1,101 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+import numpy as np
+import threading
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def cold_start_scores(recommendations: np.ndarray, metacritic: np.ndarray, popularity_weight: float = 0.7) -> np.ndarray:
+    """
+    Blend Steam recommendation counts with Metacritic scores into one [0, 1] ranking score.
+
+    Counts are log-scaled so a handful of blockbusters do not flatten everything else.
+    Games without a Metacritic score get the catalog mean, so a missing review is neutral.
+    """
+    recommendations = np.nan_to_num(recommendations.astype(np.float64), nan=0.0).clip(min=0)
+    popularity = np.log1p(recommendations)
+    popularity /= popularity.max() if len(popularity) and popularity.max() > 0 else 1.0
+
+    metacritic = metacritic.astype(np.float64)
+    known = ~np.isnan(metacritic)
+    quality = np.where(known, metacritic, metacritic[known].mean() if known.any() else 0.0) / 100.0
+    return popularity_weight * popularity + (1.0 - popularity_weight) * quality
+
+
+class ColdStartRanking:
+    """
+    Popularity/quality ranking served to users without usable library data.
+
+    Holds one global list and, per tag, the best games carrying that tag. Built once per
+    catalog model version, so serving it costs no per-user work and no database query.
+    """
+
+    def __init__(self, version: int, appids: List[str], scores: np.ndarray, buckets: Dict[str, np.ndarray]):
+        self.version = version
+        self.appids = appids                 # best first
+        self.scores = scores
+        self.positions = {appid: i for i, appid in enumerate(appids)}
+        self.buckets = buckets               # tag -> positions into appids, best first
+
+    @classmethod
+    def build(cls, rows, catalog_model, bucket_size: int = 100) -> "ColdStartRanking":
+        """Rank (appid, recommendations, metacritic_score) rows and bucket them by the catalog model's tags"""
+        rows = list(rows)
+        appids = np.array([str(appid) for appid, _, _ in rows], dtype=object)
+        recommendations = np.array([np.nan if value is None else value for _, value, _ in rows], dtype=np.float64)
+        metacritic = np.array([np.nan if value is None else value for _, _, value in rows], dtype=np.float64)
+        scores = cold_start_scores(recommendations, metacritic)
+        order = np.argsort(-scores, kind="stable")
+        ranking = cls(catalog_model.version, appids[order].tolist(), scores[order], {})
+
+        # games x tags matrix in ranking order, so each column's nonzeros are already best first
+        matrix, model_appids = catalog_model.to_csr()
+        ranked_rows = [ranking.positions.get(appid, -1) for appid in model_appids]
+        known = [i for i, position in enumerate(ranked_rows) if position >= 0]
+        if known:
+            by_tag = matrix[known].tocsc()
+            positions = np.array([ranked_rows[i] for i in known])
+            for tag_id in np.flatnonzero(np.diff(by_tag.indptr)):
+                tag = catalog_model.tags[tag_id]
+                members = np.sort(positions[by_tag.indices[by_tag.indptr[tag_id]:by_tag.indptr[tag_id + 1]]])
+                ranking.buckets[tag] = members[:bucket_size]
+        return ranking
+
+    def top(self, limit: int = 20, tags: List[str] = ()) -> List[tuple[str, float]]:
+        """Best games overall, or the best games carrying any of the given tags, as (appid, score)"""
+        if tags:
+            buckets = [self.buckets[tag] for tag in tags if tag in self.buckets]
+            positions = np.unique(np.concatenate(buckets))[:limit] if buckets else []
+        else:
+            positions = range(min(limit, len(self.appids)))
+        return [(self.appids[i], float(self.scores[i])) for i in positions]
+
+
+#-------------------------------------------------#
+# ----------PROCESS-WIDE RANKING------------------#
+#-------------------------------------------------#
+
+_ranking: Optional[ColdStartRanking] = None
+_ranking_lock = threading.Lock()
+
+
+def refresh_cold_start(db: Session, catalog_model) -> ColdStartRanking:
+    """Rebuild the ranking if it was built for another catalog model version"""
+    global _ranking
+    with _ranking_lock:
+        if _ranking is None or _ranking.version != catalog_model.version:
+            rows = db.execute(text("SELECT appid, recommendations, metacritic_score FROM games"))
+            _ranking = ColdStartRanking.build(rows, catalog_model)
+            logger.info(f"Built cold-start ranking for catalog version {catalog_model.version}: "
+                        f"{len(_ranking.appids)} games, {len(_ranking.buckets)} tag buckets")
+        return _ranking
+
+
+def current_cold_start() -> Optional[ColdStartRanking]:
+    """The in-memory ranking, None until the catalog model has been loaded in this process"""
+    return _ranking
@@ -0,0 +1,321 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from concurrent.futures import ThreadPoolExecutor
+from scipy.sparse import csr_matrix
+from src.similarity_pipeline import UserRecommendationService
+from src.recompute_scheduler import get_catalog_version
+from src.quantization import QuantizedVectors, PRECISIONS, PROFILE_PRECISION
+import numpy as np
+import pandas as pd
+import os
+import threading
+from typing import Dict, List, Optional
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How strongly each shelf signals interest, missing shelves count as 1.0
+SHELF_WEIGHTS = {
+    "played": 1.0,
+    "Wish_List": 0.5,
+}
+
+# Share of users whose library may change after training before the factors are retrained.
+# Below it, a changed user is only folded in (their own row solved against the cached game factors).
+RETRAIN_CHANGED_SHARE = float(os.environ.get("Collaborative_Retrain_Changed_Share", "0.1"))
+
+
+def _solve_rows(interactions: csr_matrix, fixed: np.ndarray, current: np.ndarray, gram: np.ndarray,
+                start: int, stop: int, cg_steps: int) -> np.ndarray:
+    """
+    Solve the ALS normal equations for rows [start, stop) of the interaction matrix.
+
+    For each row u: (YtY + reg*I + Yt Cu' Y) x_u = Yt (1 + Cu') p_u, where Cu' holds the extra
+    confidence of observed items. Instead of forming a k x k system per row, every row in the
+    block runs a few conjugate gradient steps together, warm started from its current factors.
+    """
+    block = interactions[start:stop]
+    rows = np.repeat(np.arange(stop - start), np.diff(block.indptr))
+    observed = fixed[block.indices]
+    confidence = block.data.astype(fixed.dtype)
+
+    def apply_lhs(vectors: np.ndarray) -> np.ndarray:
+        dots = np.einsum("ij,ij->i", observed, vectors[rows])
+        weighted = csr_matrix((confidence * dots, block.indices, block.indptr), shape=block.shape)
+        return vectors @ gram + weighted @ fixed
+
+    rhs = csr_matrix((1.0 + confidence, block.indices, block.indptr), shape=block.shape) @ fixed
+    solution = current[start:stop].copy()
+    residual = rhs - apply_lhs(solution)
+    direction = residual.copy()
+    residual_sq = np.einsum("ij,ij->i", residual, residual)
+
+    for _ in range(cg_steps):
+        lhs_direction = apply_lhs(direction)
+        denominator = np.einsum("ij,ij->i", direction, lhs_direction)
+        step = np.divide(residual_sq, denominator, out=np.zeros_like(residual_sq), where=denominator > 0)
+        solution += step[:, None] * direction
+        residual -= step[:, None] * lhs_direction
+        new_residual_sq = np.einsum("ij,ij->i", residual, residual)
+        ratio = np.divide(new_residual_sq, residual_sq, out=np.zeros_like(residual_sq), where=residual_sq > 0)
+        direction = residual + ratio[:, None] * direction
+        residual_sq = new_residual_sq
+
+    return solution
+
+
+def _row_blocks(interactions: csr_matrix, max_nnz: int) -> List[tuple[int, int]]:
+    """Split rows into contiguous blocks holding at most max_nnz interactions each"""
+    blocks = []
+    start = 0
+    n_rows = interactions.shape[0]
+    while start < n_rows:
+        limit = interactions.indptr[start] + max_nnz
+        stop = int(np.searchsorted(interactions.indptr, limit, side="right")) - 1
+        stop = min(max(stop, start + 1), n_rows)
+        blocks.append((start, stop))
+        start = stop
+    return blocks
+
+
+def als_half_step(interactions: csr_matrix, fixed: np.ndarray, current: np.ndarray, regularization: float,
+                  n_jobs: int = 1, cg_steps: int = 3, max_nnz_per_block: int = 65536) -> np.ndarray:
+    """Recompute one side of the factorization while holding the other side fixed"""
+    n_factors = fixed.shape[1]
+    gram = fixed.T @ fixed + regularization * np.eye(n_factors, dtype=fixed.dtype)
+    blocks = _row_blocks(interactions, max_nnz_per_block)
+    if not blocks:
+        return current.copy()
+
+    # numpy and scipy release the GIL in the heavy kernels, so threads spread blocks over cores
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        results = executor.map(lambda block: _solve_rows(interactions, fixed, current, gram, *block, cg_steps), blocks)
+        return np.vstack(list(results))
+
+
+def train_als(interactions: csr_matrix, factors: int = 32, regularization: float = 0.1,
+              iterations: int = 15, n_jobs: int = 1, cg_steps: int = 3, random_state: int = 42) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Train an implicit-feedback ALS model (Hu, Koren & Volinsky) on a users x items matrix.
+
+    Args:
+        interactions: Sparse matrix of confidence weights (alpha * interaction strength)
+        factors: Number of latent factors
+        regularization: L2 penalty applied to both factor matrices
+        iterations: Number of alternating user/item sweeps
+        n_jobs: Number of threads used to solve row blocks
+        cg_steps: Conjugate gradient steps per row and half iteration
+
+    Returns:
+        tuple: (user_factors, item_factors) as float32 arrays
+    """
+    rng = np.random.default_rng(random_state)
+    n_users, n_items = interactions.shape
+    user_factors = (rng.standard_normal((n_users, factors)) * 0.01).astype(np.float32)
+    item_factors = (rng.standard_normal((n_items, factors)) * 0.01).astype(np.float32)
+
+    interactions = interactions.tocsr().astype(np.float32)
+    interactions_t = interactions.T.tocsr()
+    for _ in range(iterations):
+        user_factors = als_half_step(interactions, item_factors, user_factors, regularization, n_jobs, cg_steps)
+        item_factors = als_half_step(interactions_t, user_factors, item_factors, regularization, n_jobs, cg_steps)
+    return user_factors, item_factors
+
+
+class CollaborativeModel:
+    """
+    Game factors of one ALS training run, shared by every collaborative recompute.
+
+    Trained against one catalog version and library generation (the sum of every user's
+    library version). Users are not stored: a recompute folds the user in by solving
+    their own row of the normal equations against the fixed game factors, which is one
+    ALS half step for a single user and costs O(games owned x factors^2).
+    """
+
+    def __init__(self, catalog_version: int, library_generation: int, n_users: int, appids: List[str],
+                 item_profiles: QuantizedVectors, gram: np.ndarray, settings: tuple):
+        self.catalog_version = catalog_version
+        self.library_generation = library_generation
+        self.n_users = n_users
+        self.appids = appids
+        self.item_index = {appid: i for i, appid in enumerate(appids)}
+        self.item_profiles = item_profiles
+        self.gram = gram                  # YtY + reg*I, shared by every fold-in
+        self.settings = settings          # hyperparameters the factors were trained with
+
+    def fold_in(self, items: np.ndarray, confidence: np.ndarray) -> np.ndarray:
+        """Exact factors of one user from their owned game indices and confidence weights"""
+        observed = self.item_profiles.dequantize(items)
+        lhs = self.gram + observed.T @ (confidence[:, None] * observed)
+        rhs = observed.T @ (1.0 + confidence)
+        return np.linalg.solve(lhs, rhs).astype(np.float32)
+
+
+_model: Optional[CollaborativeModel] = None
+_model_lock = threading.Lock()
+
+
+class CollaborativeRecommendationService(UserRecommendationService):
+    """Recommends games from other users' libraries using matrix factorization"""
+
+    def __init__(self, db_session: Session, database_url: str, factors: int = 32, regularization: float = 0.1,
+                 alpha: float = 40.0, iterations: int = 15, n_jobs: int = None, precision: str = None):
+        super().__init__(db_session, database_url)
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        # storage precision of the cached game factor profiles (Profile_Precision), "float16" halves
+        # and "int8" quarters their memory
+        self.precision = precision or PROFILE_PRECISION
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"Unknown profile precision '{self.precision}', expected one of {list(PRECISIONS)}")
+
+    @property
+    def settings(self) -> tuple:
+        return (self.factors, self.regularization, self.alpha, self.iterations, self.precision)
+
+    def fetch_all_user_games(self) -> pd.DataFrame:
+        """Fetch every user/game interaction together with its shelf and rating"""
+        query = text("SELECT username, appid, shelf, rating FROM user_games")
+        result = self.db.execute(query)
+        data = result.fetchall()
+        return pd.DataFrame(data, columns=['username', 'appid', 'shelf', 'rating'])
+
+    def fetch_user_interactions(self, username: str) -> pd.DataFrame:
+        """Fetch one user's games together with their shelf and rating"""
+        query = text("SELECT appid, shelf, rating FROM user_games WHERE username = :username")
+        data = self.db.execute(query, {"username": username}).fetchall()
+        return pd.DataFrame(data, columns=['appid', 'shelf', 'rating'])
+
+    def fetch_library_generation(self) -> int:
+        """Sum of every user's library version, grows by one with every library change"""
+        return int(self.db.execute(text("SELECT COALESCE(SUM(library_version), 0) FROM recommendation_status")).scalar())
+
+    def interaction_confidence(self, interactions_df: pd.DataFrame) -> np.ndarray:
+        """Confidence weight of each user_games row (alpha x shelf weight x (1 + rating))"""
+        shelf_weight = interactions_df['shelf'].map(SHELF_WEIGHTS).fillna(1.0).to_numpy(dtype=np.float32)
+        rating = interactions_df['rating'].fillna(0.0).to_numpy(dtype=np.float32)
+        return self.alpha * shelf_weight * (1.0 + rating)
+
+    def build_interaction_matrix(self, interactions_df: pd.DataFrame) -> tuple[csr_matrix, List[str], List[str]]:
+        """Build a sparse users x games confidence matrix from user_games rows"""
+        user_codes, usernames = pd.factorize(interactions_df['username'], sort=True)
+        game_codes, appids = pd.factorize(interactions_df['appid'].astype(str), sort=True)
+        confidence = self.interaction_confidence(interactions_df)
+
+        # duplicate username/appid pairs are summed by the csr constructor
+        matrix = csr_matrix((confidence, (user_codes, game_codes)), shape=(len(usernames), len(appids)), dtype=np.float32)
+        return matrix, list(usernames), list(appids)
+
+    def train(self, interactions: csr_matrix) -> tuple[np.ndarray, np.ndarray]:
+        """Train the factor model with this service's hyperparameters"""
+        return train_als(interactions, self.factors, self.regularization, self.iterations, self.n_jobs)
+
+    def train_model(self, catalog_version: int, library_generation: int) -> Optional[CollaborativeModel]:
+        """
+        Full ALS run over every library, keeping only the game factors at this service's precision.
+
+        Training itself needs float32 factors. They are dropped as soon as the quantized copy
+        exists, so only the QuantizedVectors (plus the small factors x factors YtY) stay cached.
+        """
+        interactions_df = self.fetch_all_user_games()
+        if interactions_df.empty:
+            return None
+        interactions, usernames, appids = self.build_interaction_matrix(interactions_df)
+        del interactions_df
+        user_factors, item_factors = self.train(interactions)
+        del user_factors, interactions
+        gram = item_factors.T @ item_factors + self.regularization * np.eye(self.factors, dtype=np.float32)
+        item_profiles = QuantizedVectors.quantize(item_factors, self.precision)
+        del item_factors
+        return CollaborativeModel(catalog_version, library_generation, len(usernames), appids,
+                                  item_profiles, gram, self.settings)
+
+    def get_model(self) -> Optional[CollaborativeModel]:
+        """
+        Shared factor model, retrained only when it no longer fits the data.
+
+        That is when the catalog version moved, the hyperparameters differ, or more than
+        RETRAIN_CHANGED_SHARE of the users changed their library since the last training.
+        """
+        global _model
+        catalog_version = get_catalog_version(self.db)
+        library_generation = self.fetch_library_generation()
+        with _model_lock:
+            model = _model
+            stale = (
+                model is None
+                or model.catalog_version != catalog_version
+                or model.settings != self.settings
+                or library_generation - model.library_generation > RETRAIN_CHANGED_SHARE * max(model.n_users, 1)
+            )
+            if stale:
+                model = self.train_model(catalog_version, library_generation)
+                if model is not None:
+                    _model = model
+                    logger.info(f"Trained collaborative model: {model.n_users} users, {len(model.appids)} games, "
+                                f"{model.item_profiles.precision} game factors ({model.item_profiles.nbytes / 1e6:.2f} MB), "
+                                f"catalog version {catalog_version}, library generation {library_generation}")
+            return model
+
+    def calculate_collaborative_recommendations(self, username: str, user_df: pd.DataFrame, model: CollaborativeModel,
+                                                top_n: int = 20) -> pd.DataFrame:
+        """Fold the user's current library into the model and keep the top N unowned games"""
+        positions = user_df['appid'].astype(str).map(model.item_index)
+        known = positions.notna().to_numpy()
+        # repeated appids add up, like in the training matrix
+        weights = pd.Series(self.interaction_confidence(user_df)[known]).groupby(positions[known].astype(int).to_numpy()).sum()
+        items = weights.index.to_numpy()
+        if not len(items):
+            return pd.DataFrame(columns=['username', 'appid', 'similarity'])
+
+        scores = model.item_profiles.dot(model.fold_in(items, weights.to_numpy(dtype=np.float32)))
+        scores[items] = -np.inf
+
+        top_n = min(top_n, len(scores) - len(items))
+        if top_n <= 0:
+            return pd.DataFrame(columns=['username', 'appid', 'similarity'])
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        top = top[np.argsort(-scores[top])]
+
+        return pd.DataFrame({
+            "username": username,
+            "appid": [model.appids[i] for i in top],
+            "similarity": scores[top].astype(float),
+        })
+
+    def generate_recommendations_for_user(self, username: str, top_n: int = 20):
+        """Main method to generate collaborative recommendations for a specific user"""
+        try:
+            logger.info(f"Starting collaborative recommendation generation for user: {username}")
+
+            # 1. Fetch this user's library
+            user_df = self.fetch_user_interactions(username)
+            if user_df.empty:
+                logger.warning(f"No games found for user: {username}, serving the cold-start list")
+                self.delete_existing_recommendations(username)
+                return
+
+            # 2. Get the shared factor model (trained once, then reused until it goes stale)
+            model = self.get_model()
+            if model is None:
+                logger.warning("No user libraries to train the collaborative model on")
+                return
+
+            # 3. Solve this user's factors against the cached game factors and score games
+            recommendations_df = self.calculate_collaborative_recommendations(username, user_df, model, top_n)
+
+            # 4. Replace existing recommendations
+            self.delete_existing_recommendations(username)
+            self.save_recommendations(recommendations_df)
+
+            logger.info(f"Successfully generated {len(recommendations_df)} collaborative recommendations for user: {username}")
+
+        except Exception as e:
+            logger.error(f"Error generating collaborative recommendations for user {username}: {str(e)}")
+            self.db.rollback()
+            raise
@@ -0,0 +1,49 @@
+from src.models import UserRecommendation, UserRecommendationModel, GameSimilarity, GameSimilarityModel, ExportFormat
+from src.serialization import iter_table_export, DEFAULT_CHUNK_SIZE
+from src.utils.db_pool import get_session_factory
+from dotenv import load_dotenv
+import argparse
+import os
+import sys
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Exportable table -> (ORM class, response model fixing the exported columns)
+EXPORT_TABLES = {
+    "user_recommendations": (UserRecommendation, UserRecommendationModel),
+    "game_similarity": (GameSimilarity, GameSimilarityModel),
+}
+
+
+def export_table(session_factory, table: str, output, export_format: ExportFormat = ExportFormat.NDJSON,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Write a whole table to a binary file object chunk by chunk, returning the bytes written"""
+    orm_class, pydantic_model = EXPORT_TABLES[table]
+    written = 0
+    for piece in iter_table_export(session_factory, orm_class, pydantic_model, export_format.value, chunk_size):
+        output.write(piece)
+        written += len(piece)
+    return written
+
+
+if __name__ == "__main__":
+    # Dump a table for analytics jobs, e.g.: python -m src.export_tables game_similarity --format csv -o similarity.csv
+    load_dotenv(override=True)
+    parser = argparse.ArgumentParser(description="Stream a recommendation table to NDJSON or CSV")
+    parser.add_argument("table", choices=list(EXPORT_TABLES))
+    parser.add_argument("--format", choices=[export_format.value for export_format in ExportFormat], default="ndjson")
+    parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows fetched per round trip")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("External_Database_Url") or os.environ.get("Internal_Database_Url")
+    session_factory = get_session_factory(database_url)
+    if args.output:
+        with open(args.output, "wb") as output:
+            written = export_table(session_factory, args.table, output, ExportFormat(args.format), args.chunk_size)
+        logger.info(f"Exported {args.table} to {args.output} ({written / 1e6:.1f} MB)")
+    else:
+        export_table(session_factory, args.table, sys.stdout.buffer, ExportFormat(args.format), args.chunk_size)
@@ -24,7 +24,8 @@ users_df = pd.read_csv("Data/steam_users.csv")
 games_df = pd.read_csv("Data/steam_games.csv")
 user_games_df = pd.read_csv("Data/steam_user_games.csv")
 user_recommendations_df = pd.read_csv("Data/user_recommendations.csv")
-game_tags_df = pd.read_csv("Data/steam_game_tags.csv")
+tags_df = pd.read_csv("Data/steam_tags.csv")
+game_tags_df = pd.read_csv("Data/steam_game_tags.csv", dtype={"appid": str})
 
 
 # Defining queries to create tables
@@ -73,19 +74,65 @@ recommendation_table_creation_query = """CREATE TABLE IF NOT EXISTS user_recomme
     )
     """
 
+# Each tag's text is stored once, game_tags only references it by a 2-byte id
+tags_creation_query = """CREATE TABLE IF NOT EXISTS tags (
+    id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name VARCHAR(255) UNIQUE NOT NULL
+    )
+    """
+
+# The bulk load writes explicit ids, so the identity continues after the highest one
+tags_identity_reset_query = """SELECT setval(pg_get_serial_sequence('tags', 'id'), (SELECT COALESCE(MAX(id), 1) FROM tags))"""
+
 game_tags_creation_query = """CREATE TABLE IF NOT EXISTS game_tags (
-    id UUID PRIMARY KEY,
     appid VARCHAR(255) NOT NULL,
-    category VARCHAR(255) NOT NULL
+    tag_id SMALLINT NOT NULL REFERENCES tags (id),
+    PRIMARY KEY (appid, tag_id)
+    )
+    """
+
+catalog_state_creation_query = """CREATE TABLE IF NOT EXISTS catalog_state (
+    name VARCHAR(255) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ
     )
     """
 
+recommendation_status_creation_query = """CREATE TABLE IF NOT EXISTS recommendation_status (
+    username VARCHAR(255) PRIMARY KEY,
+    library_version INTEGER NOT NULL DEFAULT 1,
+    library_changed_at TIMESTAMPTZ,
+    computed_library_version INTEGER,
+    computed_catalog_version INTEGER,
+    computed_at TIMESTAMPTZ,
+    recommender VARCHAR(20)
+    )
+    """
+
+# catalog_state outlives reloads, so a table created before timestamps were stored in UTC is converted once
+catalog_state_timestamptz_query = """DO $$ BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'catalog_state'
+               AND column_name = 'updated_at' AND data_type = 'timestamp without time zone') THEN
+        ALTER TABLE catalog_state ALTER COLUMN updated_at TYPE TIMESTAMPTZ USING updated_at AT TIME ZONE 'UTC';
+    END IF;
+    END $$
+    """
+
+# Bumping the catalog version marks every user's recommendations as stale
+catalog_version_bump_query = """INSERT INTO catalog_state (name, version, updated_at)
+    VALUES ('catalog', 2, NOW())
+    ON CONFLICT (name) DO UPDATE SET version = catalog_state.version + 1, updated_at = NOW()
+    """
+
 
 
 # Running queries to create tables
+# (catalog_state is kept so the catalog version keeps increasing across reloads)
+engine.delete_table('recommendation_status')
 engine.delete_table('user_recommendations')
 engine.delete_table('user_games')
 engine.delete_table('game_tags')
+engine.delete_table('tags')
 engine.delete_table('games')
 engine.delete_table('users')
 
@@ -94,7 +141,11 @@ engine.create_table(user_table_creation_query)
 engine.create_table(game_table_creation_query)
 engine.create_table(user_games_query)
 engine.create_table(recommendation_table_creation_query)
+engine.create_table(tags_creation_query)
 engine.create_table(game_tags_creation_query)
+engine.create_table(catalog_state_creation_query)
+engine.execute_query(catalog_state_timestamptz_query)
+engine.create_table(recommendation_status_creation_query)
 
 # Ensuring each row of each dataframe has a unique ID
 if 'id' not in users_df.columns:
@@ -105,19 +156,24 @@ if 'id' not in user_games_df.columns:
     user_games_df['id'] = [str(uuid.uuid4()) for _ in range(len(user_games_df))]
 if 'id' not in user_recommendations_df.columns:
     user_recommendations_df['id'] = [str(uuid.uuid4()) for _ in range(len(user_recommendations_df))]
-if 'id' not in game_tags_df.columns:
-    game_tags_df['id'] = [str(uuid.uuid4()) for _ in range(len(game_tags_df))]
 
 # Populates the 4 tables with data from the dataframes
 engine.populate_table_dynamic(users_df, 'users')
 engine.populate_table_dynamic(games_df, 'games')
 engine.populate_table_dynamic(user_games_df, 'user_games')
 engine.populate_table_dynamic(user_recommendations_df, 'user_recommendations')
+engine.populate_table_dynamic(tags_df, 'tags')
+engine.execute_query(tags_identity_reset_query)
 engine.populate_table_dynamic(game_tags_df, 'game_tags')
 
+# New catalog loaded, existing recommendations are now stale
+engine.execute_query(catalog_version_bump_query)
+
 # Testing if the tables were created and populated correctly
 print(engine.test_table('users'))
 print(engine.test_table('games'))
 print(engine.test_table('user_games'))
 print(engine.test_table('user_recommendations'))
-print(engine.test_table('game_tags'))
\ No newline at end of file
+print(engine.test_table('tags'))
+print(engine.test_table('game_tags'))
+print(engine.test_table('catalog_state'))
\ No newline at end of file
@@ -1,10 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import Response
+from contextlib import asynccontextmanager
+import asyncio
 from uuid import uuid4, UUID
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 from dotenv import load_dotenv
+from typing import List, Optional
 import os
+import time
+import logging
 
 # Load environment variables
 load_dotenv()
@@ -14,19 +19,67 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 
 # custom imports
-from src.models import User, Game, GameModel, UserModel,  UserGameModel, UserGame, GameSimilarity,GameSimilarityModel, UserRecommendation, UserRecommendationModel
-from src.similarity_pipeline import UserRecommendationService
+# NOTE: the recommendation pipelines (pandas, scikit-learn) and the cold-start ranking (numpy)
+# are imported lazily when first used so the app can start serving "/" without paying for those imports
+from src.search_index import GameSearchIndex
+from src.tag_index import TagBitmapIndex
+from src.tag_dictionary import TAG_PAIRS_QUERY
+from src.serialization import fetch_hot_model_rows, stream_model_rows, stream_table_export, encode_rows, model_field_names
+from src.utils.db_pool import get_engine, get_session_factory, pool_stats
+from src.single_flight import SingleFlight
+from src.recompute_scheduler import RecomputeScheduler, recompute_user, mark_library_changed, staleness_report
+from src.models import Base, User, Game, GameModel, UserModel,  UserGameModel, UserGame, GameSimilarity,GameSimilarityModel, UserRecommendation, UserRecommendationModel, RecommendationEngine, RecommendationStatus, RecommendationStatusModel, CatalogDeltaModel, LibraryImportModel, ExportFormat
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # Load the database connection string from environment variable or .env file
 DATABASE_URL = os.environ.get("Internal_Database_Url")
 
-# creating connection to the database
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+# Schema creation talks to the database, so it is opt-in instead of running on every boot
+CREATE_SCHEMA_ON_STARTUP = os.environ.get("Create_Schema_On_Startup", "false").lower() == "true"
+
+# shared connection pool for requests and background jobs (lazy, no connection is opened here)
+engine = get_engine(DATABASE_URL)
+SessionLocal = get_session_factory(DATABASE_URL)
+
+
+# How long the in-memory game name index may go without being synced to the games table
+SEARCH_INDEX_REFRESH_SECONDS = float(os.environ.get("Search_Index_Refresh_Seconds", "300"))
+
+# Served snapshot, replaced as a whole by the background refresh and never mutated in place
+search_index = GameSearchIndex()
+# Set once the first background sync finished (created in the lifespan, bound to the app's event loop)
+search_index_ready: Optional[asyncio.Event] = None
+
+# How long the in-memory tag bitmap index may go without being rebuilt from game_tags
+TAG_INDEX_REFRESH_SECONDS = float(os.environ.get("Tag_Index_Refresh_Seconds", "300"))
+
+# Served index, replaced as a whole by the background rebuild and never mutated in place
+tag_index = TagBitmapIndex()
+# Set once the first background build finished (created in the lifespan, bound to the app's event loop)
+tag_index_ready: Optional[asyncio.Event] = None
+
+# How long the served cold-start ranking is trusted before catalog_state.version is checked again
+COLD_START_VERSION_CHECK_SECONDS = float(os.environ.get("Cold_Start_Version_Check_Seconds", "5"))
 
-# Create the database tables (if they don't already exist)
-Base.metadata.create_all(bind=engine)
+cold_start_ranking = None
+cold_start_checked_at = 0.0
+
+# Seconds between scheduled recomputes of stale users (0 disables the in-app scheduler)
+RECOMPUTE_INTERVAL_SECONDS = float(os.environ.get("Recompute_Interval_Seconds", "0"))
+RECOMPUTE_BATCH_SIZE = int(os.environ.get("Recompute_Batch_Size", "20"))
+RECOMPUTE_MAX_USERS_PER_SECOND = float(os.environ.get("Recompute_Max_Users_Per_Second", "2"))
+
+
+# Concurrent identical reads of hot per-game / per-user rows share one query
+read_coalescer = SingleFlight()
+
+
+def create_schema():
+    """Create the database tables (if they don't already exist)"""
+    Base.metadata.create_all(bind=engine)
 
 # Dependency to get the database session
 def get_db():
@@ -36,8 +89,89 @@ def get_db():
     finally:
         db.close()
 
+def refresh_search_index() -> dict:
+    """Sync the name index with the games table, copying and swapping it only when games changed"""
+    global search_index
+    db = SessionLocal()
+    try:
+        # the served snapshot is never mutated, so it can be diffed against the catalog as is
+        changed, removed = search_index.changes(db.query(Game.appid, Game.name))
+    finally:
+        db.close()
+    if not changed and not removed:
+        return {"added": 0, "updated": 0, "removed": 0}
+    updated = search_index.copy()
+    counts = updated.apply_changes(changed, removed)
+    # one reference assignment, so a search sees either the old or the new index, never a mix
+    search_index = updated
+    return counts
+
+
+async def keep_search_index_fresh(ready: asyncio.Event):
+    """Refresh the name index off the request path every SEARCH_INDEX_REFRESH_SECONDS"""
+    while True:
+        try:
+            counts = await asyncio.to_thread(refresh_search_index)
+            if any(counts.values()):
+                logger.info(f"Search index synced with games table: {counts}")
+        except Exception as e:
+            logger.error(f"Search index refresh failed: {str(e)}")
+        finally:
+            ready.set()
+        await asyncio.sleep(SEARCH_INDEX_REFRESH_SECONDS)
+
+
+def refresh_tag_index() -> TagBitmapIndex:
+    """Rebuild the tag bitmap index from game_tags and swap it in"""
+    global tag_index
+    db = SessionLocal()
+    try:
+        rebuilt = TagBitmapIndex().build(db.execute(TAG_PAIRS_QUERY))
+    finally:
+        db.close()
+    # one reference assignment, so a browse sees either the old or the new index, never a mix
+    tag_index = rebuilt
+    return rebuilt
+
+
+async def keep_tag_index_fresh(ready: asyncio.Event):
+    """Rebuild the tag bitmap index off the request path every TAG_INDEX_REFRESH_SECONDS"""
+    while True:
+        try:
+            await asyncio.to_thread(refresh_tag_index)
+        except Exception as e:
+            logger.error(f"Tag index rebuild failed: {str(e)}")
+        finally:
+            ready.set()
+        await asyncio.sleep(TAG_INDEX_REFRESH_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run one-off startup work before the app starts accepting requests"""
+    global search_index_ready, tag_index_ready
+    if CREATE_SCHEMA_ON_STARTUP:
+        create_schema()
+
+    # the first sync runs in the background too, startup does not wait for the games table
+    search_index_ready = asyncio.Event()
+    search_index_task = asyncio.create_task(keep_search_index_fresh(search_index_ready))
+    tag_index_ready = asyncio.Event()
+    tag_index_task = asyncio.create_task(keep_tag_index_fresh(tag_index_ready))
+
+    scheduler_task = None
+    if RECOMPUTE_INTERVAL_SECONDS > 0:
+        scheduler = RecomputeScheduler(SessionLocal, DATABASE_URL, RECOMPUTE_BATCH_SIZE, RECOMPUTE_MAX_USERS_PER_SECOND)
+        scheduler_task = asyncio.create_task(scheduler.run_forever(RECOMPUTE_INTERVAL_SECONDS))
+    yield
+    search_index_task.cancel()
+    tag_index_task.cancel()
+    if scheduler_task is not None:
+        scheduler_task.cancel()
+
+
 # Initialize the FastAPI app
-app = FastAPI(title="Game Store API", version="1.0.0")
+app = FastAPI(title="Game Store API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware to allow requests 
 origins = ["http://localhost:8000"]
@@ -51,18 +185,56 @@ app.add_middleware(
 )
 
 # Background task function
-def generate_recommendations_background(username: str, database_url: str):
-    """Background task to generate recommendations for a user"""
-    # Create a new database session for the background task
-    background_engine = create_engine(database_url)
-    BackgroundSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=background_engine)
-    
-    db = BackgroundSessionLocal()
+def generate_recommendations_background(username: str, database_url: str, recommender: RecommendationEngine = RecommendationEngine.TAGS):
+    """Background task to generate recommendations for a user with the selected engine"""
+    # Borrow a session from the shared pool for the background task
+    db = get_session_factory(database_url)()
+    try:
+        recompute_user(db, database_url, username, recommender)
+    finally:
+        db.close()
+
+
+# Dependency to get the current game name index snapshot (kept fresh by the lifespan's background task)
+async def get_search_index() -> GameSearchIndex:
+    if search_index_ready is not None:
+        await search_index_ready.wait()
+    elif not len(search_index):
+        # app served without its lifespan (e.g. a bare ASGI transport): load once, off the event loop
+        await asyncio.to_thread(refresh_search_index)
+    return search_index
+
+# Dependency to get the current tag bitmap index (rebuilt by the lifespan's background task)
+async def get_tag_index() -> TagBitmapIndex:
+    if tag_index_ready is not None:
+        await tag_index_ready.wait()
+    elif not len(tag_index):
+        # app served without its lifespan (e.g. a bare ASGI transport): build once, off the event loop
+        await asyncio.to_thread(refresh_tag_index)
+    return tag_index
+
+
+def load_cold_start_ranking():
+    """Cold-start ranking for the current catalog version, (re)loading the catalog model (which builds it) if it moved"""
+    from src.catalog_model import get_catalog_model
+    from src.cold_start import current_cold_start
+
+    db = SessionLocal()
     try:
-        recommendation_service = UserRecommendationService(db, database_url)
-        recommendation_service.generate_recommendations_for_user(username)
+        get_catalog_model(db)
     finally:
         db.close()
+    return current_cold_start()
+
+
+async def get_cold_start_ranking():
+    """Served cold-start ranking, checked against catalog_state.version at most every few seconds"""
+    global cold_start_ranking, cold_start_checked_at
+    if cold_start_ranking is None or time.monotonic() - cold_start_checked_at > COLD_START_VERSION_CHECK_SECONDS:
+        # concurrent requests share one check, so a version change causes a single rebuild
+        cold_start_ranking = await read_coalescer.do(("cold_start_version",), load_cold_start_ranking)
+        cold_start_checked_at = time.monotonic()
+    return cold_start_ranking
 
 
 #-------------------------------------------------#
@@ -74,41 +246,100 @@ async def root():
 
 
 @app.get("/api/v1/games/")
-async def fetch_products(asin: str = None, db: Session = Depends(get_db)):
-    # Query the database using the SQLAlchemy Game model
-    if asin:
-        products = db.query(Game).filter(Game.asin == asin).all()
-    else:
-        products = db.query(Game).all()
-    return [GameModel.from_orm(product) for product in products]
+async def fetch_products(appid: str = None):
+    # Stream GameModel rows straight from column tuples
+    if appid:
+        return stream_model_rows(SessionLocal, Game, GameModel, Game.appid == appid)
+    return stream_model_rows(SessionLocal, Game, GameModel)
+
+@app.get("/api/v1/games/search/")
+async def search_games(q: str, limit: int = 10, index: GameSearchIndex = Depends(get_search_index)):
+    # Ranked name matches served from the in-memory index
+    return index.search(q, limit)
+
+@app.get("/api/v1/games/lookup/")
+async def lookup_game(appid: str, index: GameSearchIndex = Depends(get_search_index)):
+    game = index.get(appid)
+    if game is None:
+        raise HTTPException(status_code=404, detail="Game not found.")
+    return game
+
+@app.get("/api/v1/games/browse/")
+async def browse_games(tags: List[str] = Query(default=[]), offset: int = Query(0, ge=0),
+                       limit: int = Query(50, ge=1, le=500),
+                       index: TagBitmapIndex = Depends(get_tag_index)):
+    # Games carrying every requested tag plus per-tag facet counts, answered from the bitmap index
+    return index.browse(tags, offset, limit)
 
 @app.get("/api/v1/all_users/")
-async def fetch_all_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return [UserModel.from_orm(user) for user in users]
+async def fetch_all_users():
+    return stream_model_rows(SessionLocal, User, UserModel)
 
 @app.get("/api/v1/users/")
-async def fetch_users(username: str, db: Session = Depends(get_db)):
-    users = db.query(User).filter(User.username == username).all()
-    return [UserModel.from_orm(user) for user in users]
+async def fetch_users(username: str):
+    return stream_model_rows(SessionLocal, User, UserModel, User.username == username)
 
 @app.get("/api/v1/similar_games/")
-async def fetch_similar_games(asin: str, db: Session = Depends(get_db)):
-    # Query the database and return result
-    similar_games = db.query(GameSimilarity).filter(GameSimilarity.game1 == asin).all()
-    return [GameSimilarityModel.from_orm(game) for game in similar_games]
+async def fetch_similar_games(asin: str):
+    # Identical concurrent requests (a popular game) share one in-flight query and its encoded result
+    body = await read_coalescer.do(("similar_games", asin), lambda: fetch_hot_model_rows(
+        SessionLocal, "similarities_by_game", {"game1": asin}, GameSimilarity, GameSimilarityModel))
+    return Response(body, media_type="application/json")
 
 
 @app.get("/api/v1/user_recommended_game/")
-async def fetch_recommended_game(username: str, db: Session = Depends(get_db)):
-    user_recommendations = db.query(UserRecommendation).filter(UserRecommendation.username == username)
-    return [UserRecommendationModel.from_orm(recommendation) for recommendation in user_recommendations]
+async def fetch_recommended_game(username: str):
+    # Identical concurrent requests (e.g. a page refresh) share one in-flight query and its encoded result
+    body = await read_coalescer.do(("user_recommended_game", username), lambda: fetch_hot_model_rows(
+        SessionLocal, "recommendations_by_username", {"username": username}, UserRecommendation, UserRecommendationModel))
+    if body == b"[]":
+        # No stored recommendations (no games, or none in the catalog yet): serve the precomputed cold-start list
+        ranking = await get_cold_start_ranking()
+        body = encode_rows(model_field_names(UserRecommendationModel),
+                           [(None, username, appid, score) for appid, score in ranking.top()])
+    return Response(body, media_type="application/json")
+
+@app.get("/api/v1/recommendations/cold_start/")
+async def fetch_cold_start_recommendations(tags: List[str] = Query(default=[]), limit: int = 20):
+    # Popularity/quality ranking served from memory, optionally only games carrying any of the tags
+    ranking = await get_cold_start_ranking()
+    return [{"appid": appid, "score": score} for appid, score in ranking.top(limit, tags)]
+
+@app.get("/api/v1/export/user_recommendations/")
+async def export_user_recommendations(format: ExportFormat = ExportFormat.NDJSON):
+    # Whole table for analytics, paged through a server-side cursor in constant memory
+    return stream_table_export(SessionLocal, UserRecommendation, UserRecommendationModel, format.value)
+
+@app.get("/api/v1/export/game_similarity/")
+async def export_game_similarity(format: ExportFormat = ExportFormat.NDJSON):
+    return stream_table_export(SessionLocal, GameSimilarity, GameSimilarityModel, format.value)
+
+@app.get("/api/v1/metrics/coalescing/")
+async def fetch_coalescing_metrics():
+    # How many reads were served by another request's in-flight query
+    return read_coalescer.metrics()
+
+@app.get("/api/v1/metrics/db_pool/")
+async def fetch_db_pool_metrics():
+    # Connections checked out / idle / overflowing and lifetime connect and checkout counts
+    return pool_stats()
+
+@app.get("/api/v1/recommendations/staleness/")
+async def fetch_recommendation_staleness(db: Session = Depends(get_db)):
+    # How many users have recommendations computed against an old library or catalog version
+    return staleness_report(db)
+
+@app.get("/api/v1/recommendations/status/")
+async def fetch_recommendation_status(username: str, db: Session = Depends(get_db)):
+    status = db.get(RecommendationStatus, username)
+    if status is None:
+        raise HTTPException(status_code=404, detail="User has no recommendation status.")
+    return RecommendationStatusModel.from_orm(status)
 
 @app.get("/api/v1/user_game/")
-async def fetch_user_game(username: str, db: Session = Depends(get_db)):
-    # Query the database using the SQLAlchemyfor user_games
-    user_games = db.query(UserGame).filter(UserGame.username == username)
-    return [UserGameModel.from_orm(user_game) for user_game in user_games]
+async def fetch_user_game(username: str):
+    # Stream UserGameModel rows straight from column tuples
+    return stream_model_rows(SessionLocal, UserGame, UserGameModel, UserGame.username == username)
 
 #-------------------------------------------------#
 # ----------PART 2: POST METHODS------------------#
@@ -116,16 +347,16 @@ async def fetch_user_game(username: str, db: Session = Depends(get_db)):
 
 
 @app.post("/api/v1/user_game/")
-async def create_user_game(user_game: UserGameModel, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def create_user_game(user_game: UserGameModel, background_tasks: BackgroundTasks, recommender: RecommendationEngine = RecommendationEngine.TAGS, db: Session = Depends(get_db)):
     # Check if the entry already exists
-    existing = db.query(UserGame).filter_by(username=user_game.username, asin=user_game.asin).first()
+    existing = db.query(UserGame).filter_by(username=user_game.username, appid=user_game.appid).first()
     if existing:
         raise HTTPException(status_code=400, detail="User already has this game.")
 
     # Prepare data with defaults
     user_game_data = {
         "username": user_game.username,
-        "asin": user_game.asin,
+        "appid": user_game.appid,
         "shelf": user_game.shelf if user_game.shelf is not None else "Wish_List",
         "rating": user_game.rating if user_game.rating is not None else 0.0,
         "review": user_game.review if user_game.review is not None else ""
@@ -133,29 +364,83 @@ async def create_user_game(user_game: UserGameModel, background_tasks: Backgroun
     if user_game.id is not None:
         user_game_data["id"] = UUID(str(user_game.id))
 
-    # Save the user game to database
+    # Save the user game to database, building the response before commit so nothing is
+    # lazy-loaded afterwards (that would hold a connection while the background job runs).
+    # The library version is bumped in the same transaction as the insert.
     db_user_game = UserGame(**user_game_data)
     db.add(db_user_game)
+    db.flush()
+    created = UserGameModel.from_orm(db_user_game)
+    mark_library_changed(db, user_game.username)
     db.commit()
-    db.refresh(db_user_game)
     
     # Trigger background task to generate recommendations for this user
-    background_tasks.add_task(generate_recommendations_background, user_game.username, DATABASE_URL)
+    background_tasks.add_task(generate_recommendations_background, user_game.username, DATABASE_URL, recommender)
     
-    return db_user_game
+    return created
+
+@app.post("/api/v1/user_game/bulk/")
+async def import_user_library(library: LibraryImportModel, background_tasks: BackgroundTasks, recommender: RecommendationEngine = RecommendationEngine.TAGS, db: Session = Depends(get_db)):
+    # Drop repeated appids within the request, the first occurrence wins
+    games = {}
+    for game in library.games:
+        games.setdefault(game.appid, game)
+
+    # One query finds the games the user already has
+    existing = {appid for appid, in db.query(UserGame.appid).filter(
+        UserGame.username == library.username, UserGame.appid.in_(list(games)))} if games else set()
+
+    rows = [
+        {
+            "id": uuid4(),
+            "username": library.username,
+            "appid": appid,
+            "shelf": game.shelf if game.shelf is not None else "Wish_List",
+            "rating": game.rating if game.rating is not None else 0.0,
+            "review": game.review if game.review is not None else "",
+        }
+        for appid, game in games.items() if appid not in existing
+    ]
+
+    # One batched insert and a single recompute for the whole library
+    if rows:
+        db.execute(insert(UserGame), rows)
+        mark_library_changed(db, library.username)
+        db.commit()
+        background_tasks.add_task(generate_recommendations_background, library.username, DATABASE_URL, recommender)
+
+    return {
+        "username": library.username,
+        "received": len(library.games),
+        "inserted": len(rows),
+        "already_owned": len(existing),
+        "duplicates_in_request": len(library.games) - len(games),
+    }
 
 @app.post("/api/v1/generate_recommendations/")
-async def generate_recommendations_manually(username: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def generate_recommendations_manually(username: str, background_tasks: BackgroundTasks, recommender: RecommendationEngine = RecommendationEngine.TAGS, db: Session = Depends(get_db)):
     """Manually trigger recommendation generation for a user"""
     # Check if user exists in user_games table
     user_games = db.query(UserGame).filter(UserGame.username == username).first()
     if not user_games:
         raise HTTPException(status_code=404, detail="User has no games in the system.")
+    # End the read transaction so the request's connection is back in the pool while the job runs
+    db.close()
     
     # Trigger background task
-    background_tasks.add_task(generate_recommendations_background, username, DATABASE_URL)
+    background_tasks.add_task(generate_recommendations_background, username, DATABASE_URL, recommender)
     
-    return {"message": f"Recommendation generation started for user: {username}"}
+    return {"message": f"Recommendation generation ({recommender.value}) started for user: {username}"}
+
+@app.post("/api/v1/catalog/delta/")
+def apply_catalog_delta_endpoint(delta: CatalogDeltaModel, db: Session = Depends(get_db)):
+    """Apply a small game/tag change to game_tags and the in-memory catalog model without a rebuild"""
+    # a plain def runs in the threadpool: the writes, a first model load, compaction and the
+    # cold-start rebuild would otherwise block the event loop and stall every other request
+    from src.catalog_model import apply_catalog_delta
+
+    version = apply_catalog_delta(db, delta.added_games, delta.removed_games, delta.added_tags, delta.removed_tags)
+    return {"catalog_version": version}
 
 #-------------------------------------------------#
 # ----------PART 3: DELETE METHODS----------------#
@@ -163,11 +448,12 @@ async def generate_recommendations_manually(username: str, background_tasks: Bac
 
 
 @app.delete("/api/v1/user_game/")
-async def delete_user_game(username: str, asin: str, db: Session = Depends(get_db)):
-    user_game = db.query(UserGame).filter_by(username=username, asin=asin).first()
+async def delete_user_game(username: str, appid: str, db: Session = Depends(get_db)):
+    user_game = db.query(UserGame).filter_by(username=username, appid=appid).first()
     if not user_game:
         raise HTTPException(status_code=404, detail="User game not found.")
     db.delete(user_game)
+    mark_library_changed(db, username)
     db.commit()
     return {"detail": "User game deleted successfully."}
 
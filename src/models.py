@@ -1,23 +1,21 @@
 from pydantic import BaseModel
 from uuid import UUID,uuid4
-from typing import Optional
+from typing import Optional, Dict, List
 from enum import Enum
-from sqlalchemy import Column, String, Float, Integer
+from sqlalchemy import Column, String, Float, Integer, SmallInteger, DateTime, ForeignKey, Identity
+from datetime import datetime, timezone
 import sqlalchemy.dialects.postgresql as pg
 from sqlalchemy.dialects.postgresql import UUID as SA_UUID
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
 from uuid import UUID
 
-# loading sql model
-from sqlmodel import Field, Session, SQLModel, create_engine, select
-
 # Initialize the base class for SQLAlchemy models
 Base = declarative_base()
 
 # This is the Game model for the database
 class Game(Base):
-    __tablename__ = "optigame_products"  # Table name in the PostgreSQL database
+    __tablename__ = "games"  # Table name in the PostgreSQL database
 
     id = Column(pg.UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
     appid = Column(String, unique=True, nullable=False)  
@@ -148,3 +146,94 @@ class UserRecommendationModel(BaseModel):
         orm_mode = True  # Enable ORM mode to work with SQLAlchemy objects
         from_attributes = True # Enable attribute access for SQLAlchemy objects
 
+
+# One owned game in a bulk library import
+class LibraryGameModel(BaseModel):
+    appid: str
+    shelf: Optional[str] = None
+    rating: Optional[float] = None
+    review: Optional[str] = None
+
+
+# A user's whole library, imported with one dedup query, one batched insert and one recompute
+class LibraryImportModel(BaseModel):
+    username: str
+    games: List[LibraryGameModel]
+
+
+# Tag dictionary, each distinct tag text is stored once with a small integer id
+class Tag(Base):
+    __tablename__ = "tags"  # Table name in the PostgreSQL database
+
+    # SQLite only auto-assigns an INTEGER primary key
+    id = Column(SmallInteger().with_variant(Integer(), "sqlite"), Identity(), primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+# appid:tag_id association, one row per tag of a game
+class GameTag(Base):
+    __tablename__ = "game_tags"  # Table name in the PostgreSQL database
+
+    appid = Column(String, primary_key=True)
+    tag_id = Column(SmallInteger, ForeignKey("tags.id"), primary_key=True)
+
+
+def utc_now() -> datetime:
+    """Timezone-aware current time in UTC"""
+    return datetime.now(timezone.utc)
+
+
+# Monotonic version of the catalog model, bumped whenever games or tags are reloaded
+class CatalogState(Base):
+    __tablename__ = "catalog_state"  # Table name in the PostgreSQL database
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), nullable=True, default=utc_now)
+
+
+# Which library and catalog versions a user's stored recommendations were computed against
+class RecommendationStatus(Base):
+    __tablename__ = "recommendation_status"  # Table name in the PostgreSQL database
+
+    username = Column(String, primary_key=True)
+    library_version = Column(Integer, nullable=False, default=1)
+    library_changed_at = Column(DateTime(timezone=True), nullable=True, default=utc_now)
+    computed_library_version = Column(Integer, nullable=True)
+    computed_catalog_version = Column(Integer, nullable=True)
+    computed_at = Column(DateTime(timezone=True), nullable=True)
+    recommender = Column(String, nullable=True)  # engine the user last asked for, reused by scheduled recomputes
+
+class RecommendationStatusModel(BaseModel):
+    username: str
+    library_version: int
+    library_changed_at: Optional[datetime] = None
+    computed_library_version: Optional[int] = None
+    computed_catalog_version: Optional[int] = None
+    computed_at: Optional[datetime] = None
+    recommender: Optional[str] = None
+
+    class Config:
+        orm_mode = True  # Enable ORM mode to work with SQLAlchemy objects
+        from_attributes = True # Enable attribute access for SQLAlchemy objects
+
+
+# A small change to the game/tag catalog pushed by the ingest path
+class CatalogDeltaModel(BaseModel):
+    added_games: Dict[str, List[str]] = {}     # appid -> tags of a new or fully retagged game
+    removed_games: List[str] = []
+    added_tags: Dict[str, List[str]] = {}      # appid -> tags to add to an existing game
+    removed_tags: Dict[str, List[str]] = {}    # appid -> tags to remove from an existing game
+
+
+# Formats of the streaming table exports
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"  # one JSON object per line
+    CSV = "csv"        # header line, then one row per line
+
+
+# Recommendation engines that can be selected per request
+class RecommendationEngine(str, Enum):
+    TAGS = "tags"                    # content-based cosine over game tags
+    COLLABORATIVE = "collaborative"  # implicit-feedback ALS over user_games
+    HYBRID = "hybrid"                # hashed description text blended with tags
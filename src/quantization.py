@@ -0,0 +1,114 @@
+from typing import Optional
+import numpy as np
+import os
+
+# Reduced-precision storage for dense profile vectors (ALS factors, dense tag profiles).
+# Each row is divided by its own scale before it is cast, so float16 rows live in [-1, 1]
+# where half precision is densest and int8 rows use the full [-127, 127] range.
+
+PRECISIONS = {
+    "float64": np.float64,
+    "float32": np.float32,
+    "float16": np.float16,
+    "int8": np.int8,
+}
+
+# Precision the collaborative engine keeps its cached game factors at ("float16"/"int8" to save memory)
+PROFILE_PRECISION = os.environ.get("Profile_Precision", "float32")
+
+# Rows dequantized per block while scoring, bounds the float32 scratch memory
+DEFAULT_BLOCK_ROWS = 4096
+
+
+class QuantizedVectors:
+    """Row vectors stored as float16 or int8 values plus one float32 scale per row"""
+
+    def __init__(self, values: np.ndarray, scales: np.ndarray, precision: str):
+        self.values = values
+        self.scales = scales
+        self.precision = precision
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.scales.nbytes
+
+    @classmethod
+    def quantize(cls, matrix: np.ndarray, precision: str = "int8") -> "QuantizedVectors":
+        """
+        Quantize the rows of a dense matrix.
+
+        Args:
+            matrix: 2-D array with one profile vector per row
+            precision: One of "float64", "float32", "float16", "int8"
+
+        Returns:
+            QuantizedVectors: values of the requested dtype and per-row scales
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}', expected one of {list(PRECISIONS)}")
+        matrix = np.atleast_2d(np.asarray(matrix))
+        dtype = PRECISIONS[precision]
+        if precision in ("float64", "float32"):
+            return cls(matrix.astype(dtype, copy=False), np.ones(matrix.shape[0], dtype=np.float32), precision)
+
+        peak = np.abs(matrix).max(axis=1) if matrix.size else np.zeros(matrix.shape[0])
+        limit = 127.0 if precision == "int8" else 1.0
+        scales = np.where(peak > 0, peak / limit, 1.0).astype(np.float32)
+        scaled = matrix / scales[:, None]
+        if precision == "int8":
+            scaled = np.clip(np.rint(scaled), -127, 127)
+        return cls(scaled.astype(dtype), scales, precision)
+
+    def dequantize(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """float32 (float64 for float64 storage) copy of all rows, or of the given row numbers"""
+        values = self.values if rows is None else self.values[rows]
+        scales = self.scales if rows is None else self.scales[rows]
+        if self.precision in ("float64", "float32"):
+            return values.copy()
+        return values.astype(np.float32) * scales[:, None]
+
+    def dot(self, vectors: np.ndarray, block_rows: int = DEFAULT_BLOCK_ROWS) -> np.ndarray:
+        """
+        Scores of every row against one vector (1-D result) or a batch of vectors (2-D result).
+
+        Rows are widened to float32 (float64 storage stays float64) one block at a time and
+        multiplied with BLAS, and the per-row scale is applied to the block's scores
+        instead of to the block itself.
+        """
+        dtype = np.float64 if self.values.dtype == np.float64 else np.float32
+        vectors = np.asarray(vectors, dtype=dtype)
+        out = np.empty((len(self),) + vectors.shape[1:], dtype=dtype)
+        for start in range(0, len(self), block_rows):
+            block = self.values[start:start + block_rows].astype(dtype, copy=False)
+            scores = block @ vectors
+            scales = self.scales[start:start + block_rows]
+            out[start:start + block_rows] = scores * (scales if scores.ndim == 1 else scales[:, None])
+        return out
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores per column (scores is n_items or n_items x n_queries)"""
+    scores = scores.reshape(scores.shape[0], -1)
+    k = min(k, scores.shape[0])
+    return np.argpartition(-scores, k - 1, axis=0)[:k]
+
+
+def recall_at_k(exact_scores: np.ndarray, approx_scores: np.ndarray, k: int = 20) -> float:
+    """
+    Mean share of the approximate top-k that belongs in the exact top-k.
+
+    An item counts as a hit when its exact score reaches the exact k-th best score, so
+    games with tied scores (e.g. identical tag sets) are interchangeable.
+    """
+    exact_scores = exact_scores.reshape(exact_scores.shape[0], -1)
+    approx = top_k_indices(approx_scores, k)
+    kth_best = np.take_along_axis(exact_scores, top_k_indices(exact_scores, k), axis=0).min(axis=0)
+    hits = np.take_along_axis(exact_scores, approx, axis=0) >= kth_best - 1e-9
+    return float(hits.mean())
@@ -1,6 +1,7 @@
 import pandas as pd
 import requests
 import time
+from tag_dictionary import encode_tags
 
 
 
@@ -145,6 +146,7 @@ game_info_df = get_game_data(game_df, n_games = 2000)
 # writing to csv
 game_info_df.to_csv("Data/steam_games.csv", index=False)
 
-# generating tags dataframe
-game_tags_df = pivot_tags(game_info_df)
+# generating tag dictionary and integer-encoded game tags
+tags_df, game_tags_df = encode_tags(pivot_tags(game_info_df))
+tags_df.to_csv("Data/steam_tags.csv", index=False)
 game_tags_df.to_csv("Data/steam_game_tags.csv", index=False)
@@ -0,0 +1,281 @@
+from sqlalchemy import text, bindparam, case, or_, update, DateTime
+from sqlalchemy.orm import Session
+from src.models import CatalogState, RecommendationStatus, RecommendationEngine, utc_now
+from src.utils.db_pool import get_session_factory
+from dotenv import load_dotenv
+from typing import Callable, List, Optional
+import argparse
+import asyncio
+import os
+import time
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CATALOG_STATE_NAME = "catalog"
+
+# One statement, so concurrent first writes for a new user cannot both insert the status row
+LIBRARY_CHANGED_UPSERT = text(
+    "INSERT INTO recommendation_status (username, library_version, library_changed_at) "
+    "VALUES (:username, 1, :changed_at) "
+    "ON CONFLICT (username) DO UPDATE SET library_version = recommendation_status.library_version + 1, "
+    "library_changed_at = excluded.library_changed_at"
+).bindparams(bindparam("changed_at", type_=DateTime(timezone=True)))
+STATUS_INSERT = text(
+    "INSERT INTO recommendation_status (username, library_version) VALUES (:username, 1) "
+    "ON CONFLICT (username) DO NOTHING"
+)
+
+
+#-------------------------------------------------#
+# ----------VERSION TRACKING----------------------#
+#-------------------------------------------------#
+
+def get_catalog_version(db: Session) -> int:
+    """Current catalog model version (1 if the catalog was never versioned)"""
+    state = db.get(CatalogState, CATALOG_STATE_NAME)
+    return state.version if state else 1
+
+
+def bump_catalog_version(db: Session) -> int:
+    """Increment the catalog version so every user's recommendations become stale"""
+    updated = db.execute(
+        update(CatalogState)
+        .where(CatalogState.name == CATALOG_STATE_NAME)
+        .values(version=CatalogState.version + 1, updated_at=utc_now())
+    )
+    if not updated.rowcount:
+        db.add(CatalogState(name=CATALOG_STATE_NAME, version=2, updated_at=utc_now()))
+    db.commit()
+    return get_catalog_version(db)
+
+
+def mark_library_changed(db: Session, username: str):
+    """
+    Record that a user's library changed so their recommendations are stale.
+
+    Does not commit: call it in the same transaction as the user_games change, so the
+    version bump and the change are saved (or rolled back) together.
+    """
+    db.execute(LIBRARY_CHANGED_UPSERT, {"username": username, "changed_at": utc_now()})
+
+
+def mark_computed(db: Session, username: str, library_version: int, catalog_version: int):
+    """Record the versions a user's freshly saved recommendations were computed against"""
+    db.execute(
+        update(RecommendationStatus)
+        .where(RecommendationStatus.username == username)
+        .values(computed_library_version=library_version, computed_catalog_version=catalog_version,
+                computed_at=utc_now())
+    )
+    db.commit()
+
+
+def backfill_missing_status(db: Session) -> int:
+    """Create status rows for users that have games but were never tracked (e.g. after a reload)"""
+    result = db.execute(text(
+        "INSERT INTO recommendation_status (username, library_version) "
+        "SELECT DISTINCT username, 1 FROM user_games "
+        "WHERE username NOT IN (SELECT username FROM recommendation_status)"
+    ))
+    db.commit()
+    return result.rowcount or 0
+
+
+def _staleness_conditions(catalog_version: int):
+    library_stale = or_(
+        RecommendationStatus.computed_library_version.is_(None),
+        RecommendationStatus.computed_library_version < RecommendationStatus.library_version,
+    )
+    catalog_stale = or_(
+        RecommendationStatus.computed_catalog_version.is_(None),
+        RecommendationStatus.computed_catalog_version < catalog_version,
+    )
+    return library_stale, catalog_stale
+
+
+def staleness_report(db: Session) -> dict:
+    """Count users whose recommendations are out of date, split by cause"""
+    catalog_version = get_catalog_version(db)
+    library_stale, catalog_stale = _staleness_conditions(catalog_version)
+    tracked = db.query(RecommendationStatus).count()
+    library_count = db.query(RecommendationStatus).filter(library_stale).count()
+    stale_count = db.query(RecommendationStatus).filter(or_(library_stale, catalog_stale)).count()
+    # users with games but no status row have never been computed against any version
+    untracked = db.execute(text(
+        "SELECT COUNT(DISTINCT username) FROM user_games "
+        "WHERE username NOT IN (SELECT username FROM recommendation_status)"
+    )).scalar()
+    return {
+        "catalog_version": catalog_version,
+        "tracked_users": tracked,
+        "stale_users": stale_count + untracked,
+        "library_stale_users": library_count,
+        "catalog_stale_users": stale_count - library_count,
+        "untracked_users": untracked,
+    }
+
+
+def find_stale_users(db: Session, limit: int) -> List[str]:
+    """
+    Stale users in priority order.
+
+    Users whose own library changed come first (oldest change first), then users who
+    are only behind the catalog (least recently computed first).
+    """
+    catalog_version = get_catalog_version(db)
+    library_stale, catalog_stale = _staleness_conditions(catalog_version)
+    rows = (
+        db.query(RecommendationStatus.username)
+        .filter(or_(library_stale, catalog_stale))
+        .order_by(
+            case((library_stale, 0), else_=1),
+            RecommendationStatus.library_changed_at.asc().nulls_first(),
+            RecommendationStatus.computed_at.asc().nulls_first(),
+        )
+        .limit(limit)
+        .all()
+    )
+    return [row.username for row in rows]
+
+
+#-------------------------------------------------#
+# ----------RECOMPUTE JOBS------------------------#
+#-------------------------------------------------#
+
+def get_recommendation_service_class(recommender: RecommendationEngine):
+    """Import the selected engine lazily so pandas/scikit-learn load only when a job runs"""
+    if recommender == RecommendationEngine.COLLABORATIVE:
+        from src.collaborative_pipeline import CollaborativeRecommendationService
+        return CollaborativeRecommendationService
+    if recommender == RecommendationEngine.HYBRID:
+        from src.text_pipeline import TextRecommendationService
+        return TextRecommendationService
+    from src.similarity_pipeline import UserRecommendationService
+    return UserRecommendationService
+
+
+def stored_recommender(status: Optional[RecommendationStatus],
+                       default: RecommendationEngine = RecommendationEngine.TAGS) -> RecommendationEngine:
+    """Engine the user's recommendations were last generated with, default if none was stored"""
+    if status is None or not status.recommender:
+        return default
+    try:
+        return RecommendationEngine(status.recommender)
+    except ValueError:
+        return default
+
+
+def recompute_user(db: Session, database_url: str, username: str,
+                   recommender: RecommendationEngine = RecommendationEngine.TAGS):
+    """Regenerate one user's recommendations and tag them with the versions and engine they were built from"""
+    # snapshot versions first, a change that lands mid-job leaves the user stale
+    status = db.get(RecommendationStatus, username)
+    if status is None:
+        # a concurrent first write may create the row at the same time, whichever lands first is kept
+        db.execute(STATUS_INSERT, {"username": username})
+        db.commit()
+        status = db.get(RecommendationStatus, username)
+    library_version = status.library_version
+    catalog_version = get_catalog_version(db)
+    if status.recommender != recommender.value:
+        # remembered so scheduled recomputes keep the engine the user asked for
+        status.recommender = recommender.value
+        db.commit()
+
+    service_class = get_recommendation_service_class(recommender)
+    service_class(db, database_url).generate_recommendations_for_user(username)
+    mark_computed(db, username, library_version, catalog_version)
+
+
+class RecomputeScheduler:
+    """
+    Recomputes only stale users, in prioritized and rate-limited batches.
+
+    Each user is recomputed with the engine stored in their status row, recommender is
+    only used for users that never chose one.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], database_url: str, batch_size: int = 20,
+                 max_users_per_second: float = 2.0, recommender: RecommendationEngine = RecommendationEngine.TAGS):
+        self.session_factory = session_factory
+        self.database_url = database_url
+        self.batch_size = batch_size
+        self.max_users_per_second = max_users_per_second
+        self.recommender = recommender
+
+    def run_batch(self, skip: set = frozenset()) -> Optional[List[str]]:
+        """Recompute up to batch_size stale users, returning the ones that failed (None if nobody was stale)"""
+        db = self.session_factory()
+        try:
+            backfill_missing_status(db)
+            usernames = [u for u in find_stale_users(db, self.batch_size + len(skip)) if u not in skip][:self.batch_size]
+            failed = []
+            min_interval = 1.0 / self.max_users_per_second if self.max_users_per_second > 0 else 0.0
+            for username in usernames:
+                started = time.monotonic()
+                try:
+                    recommender = stored_recommender(db.get(RecommendationStatus, username), self.recommender)
+                    recompute_user(db, self.database_url, username, recommender)
+                except Exception as e:
+                    logger.error(f"Scheduled recompute failed for user {username}: {str(e)}")
+                    db.rollback()
+                    failed.append(username)
+                time.sleep(max(0.0, min_interval - (time.monotonic() - started)))
+            if usernames:
+                report = staleness_report(db)
+                logger.info(f"Recomputed {len(usernames) - len(failed)} users, {report['stale_users']} still stale")
+            return failed if usernames else None
+        finally:
+            db.close()
+
+    def run_until_fresh(self, max_batches: int = None) -> dict:
+        """Keep running batches until no stale users remain (users that fail are skipped)"""
+        failed = set()
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batch_failed = self.run_batch(skip=failed)
+            if batch_failed is None:
+                break
+            failed.update(batch_failed)
+            batches += 1
+        db = self.session_factory()
+        try:
+            return staleness_report(db)
+        finally:
+            db.close()
+
+    async def run_forever(self, interval_seconds: float):
+        """Run one batch every interval in a worker thread so the event loop stays free"""
+        while True:
+            try:
+                await asyncio.to_thread(self.run_batch)
+            except Exception as e:
+                logger.error(f"Recompute scheduler batch failed: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    # Run as a one-off job, e.g. after load_database.py: python -m src.recompute_scheduler
+    load_dotenv(override=True)
+    parser = argparse.ArgumentParser(description="Recompute stale user recommendations")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--max-users-per-second", type=float, default=2.0)
+    parser.add_argument("--max-batches", type=int, default=None)
+    parser.add_argument("--recommender", choices=[engine.value for engine in RecommendationEngine], default="tags",
+                        help="Engine for users without a stored one (others keep the engine they last used)")
+    parser.add_argument("--report-only", action="store_true", help="Only print how many users are stale")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("External_Database_Url") or os.environ.get("Internal_Database_Url")
+    session_factory = get_session_factory(database_url)
+    scheduler = RecomputeScheduler(session_factory, database_url, args.batch_size,
+                                   args.max_users_per_second, RecommendationEngine(args.recommender))
+    if args.report_only:
+        with session_factory() as db:
+            backfill_missing_status(db)
+            print(staleness_report(db))
+    else:
+        print(scheduler.run_until_fresh(args.max_batches))
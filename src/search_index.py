@@ -0,0 +1,177 @@
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Iterable, Optional
+import heapq
+import re
+import unicodedata
+
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents and collapse punctuation so 'Half-Life™' matches 'half life'"""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return NON_ALPHANUMERIC.sub(" ", name.lower()).strip()
+
+
+def name_ngrams(normalized: str, size: int = 3) -> set[str]:
+    """Character n-grams of a normalized name, padded so short words still produce grams"""
+    padded = f" {normalized} "
+    if len(padded) < size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+class GameSearchIndex:
+    """
+    In-memory name search over the game catalog.
+
+    Holds a sorted list of normalized names for prefix matches, an n-gram inverted index
+    for fuzzy/infix matches and a dict for exact appid lookups. Games can be added,
+    renamed or removed one at a time, so a refresh only touches what changed.
+
+    Mutations are not safe against concurrent searches. A served index is treated as a
+    read-only snapshot: refresh a copy() and swap the reference instead.
+    """
+
+    def __init__(self, ngram_size: int = 3):
+        self.ngram_size = ngram_size
+        self._names: dict[str, str] = {}                 # appid -> display name
+        self._normalized: dict[str, str] = {}            # appid -> normalized name
+        self._grams: dict[str, set[str]] = {}            # n-gram -> appids
+        self._gram_counts: dict[str, int] = {}           # appid -> number of distinct n-grams
+        self._sorted_names: list[tuple[str, str]] = []   # (normalized name, appid)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def copy(self) -> "GameSearchIndex":
+        """Independent copy that can be refreshed while this one keeps serving searches"""
+        index = GameSearchIndex(self.ngram_size)
+        index._names = dict(self._names)
+        index._normalized = dict(self._normalized)
+        index._grams = {gram: set(appids) for gram, appids in self._grams.items()}
+        index._gram_counts = dict(self._gram_counts)
+        index._sorted_names = list(self._sorted_names)
+        return index
+
+    def get(self, appid: str) -> Optional[dict]:
+        """O(1) lookup by exact appid"""
+        name = self._names.get(appid)
+        if name is None:
+            return None
+        return {"appid": appid, "name": name}
+
+    def add(self, appid: str, name: str):
+        """Add a game, replacing its previous name if it is already indexed"""
+        if appid in self._names:
+            if self._names[appid] == name:
+                return
+            self.remove(appid)
+
+        normalized = normalize_name(name)
+        self._names[appid] = name
+        self._normalized[appid] = normalized
+        grams = name_ngrams(normalized, self.ngram_size)
+        self._gram_counts[appid] = len(grams)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(appid)
+        insort(self._sorted_names, (normalized, appid))
+
+    def remove(self, appid: str):
+        """Remove a game from every structure of the index"""
+        if appid not in self._names:
+            return
+        normalized = self._normalized.pop(appid)
+        del self._names[appid]
+        del self._gram_counts[appid]
+        for gram in name_ngrams(normalized, self.ngram_size):
+            postings = self._grams.get(gram)
+            if postings is not None:
+                postings.discard(appid)
+                if not postings:
+                    del self._grams[gram]
+        position = bisect_left(self._sorted_names, (normalized, appid))
+        if position < len(self._sorted_names) and self._sorted_names[position] == (normalized, appid):
+            del self._sorted_names[position]
+
+    def changes(self, games: Iterable[tuple[str, str]]) -> tuple[list[tuple[str, str]], list[str]]:
+        """
+        Diff the catalog against the index without modifying it.
+
+        Args:
+            games: Iterable of (appid, name) pairs describing the full catalog
+
+        Returns:
+            tuple: ((appid, name) pairs that are new or renamed, appids no longer in the catalog)
+        """
+        changed = []
+        seen = set()
+        for appid, name in games:
+            appid = str(appid)
+            seen.add(appid)
+            if self._names.get(appid) != name:
+                changed.append((appid, name))
+        removed = [appid for appid in self._names if appid not in seen]
+        return changed, removed
+
+    def apply_changes(self, changed: Iterable[tuple[str, str]], removed: Iterable[str]) -> dict:
+        """Apply a diff from changes(), returning the number of games 'added', 'updated' and 'removed'"""
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        for appid, name in changed:
+            counts["added" if appid not in self._names else "updated"] += 1
+            self.add(appid, name)
+        for appid in removed:
+            self.remove(appid)
+            counts["removed"] += 1
+        return counts
+
+    def refresh(self, games: Iterable[tuple[str, str]]) -> dict:
+        """
+        Bring the index in line with the catalog, touching only changed games.
+
+        Args:
+            games: Iterable of (appid, name) pairs describing the full catalog
+
+        Returns:
+            dict: Number of games 'added', 'updated' and 'removed'
+        """
+        return self.apply_changes(*self.changes(games))
+
+    def _prefix_matches(self, normalized: str, limit: int) -> list[str]:
+        """Appids whose normalized name starts with the query, in alphabetical order"""
+        matches = []
+        position = bisect_left(self._sorted_names, (normalized, ""))
+        while position < len(self._sorted_names) and len(matches) < limit:
+            name, appid = self._sorted_names[position]
+            if not name.startswith(normalized):
+                break
+            matches.append(appid)
+            position += 1
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """
+        Rank games by how well their name matches the query.
+
+        Exact matches rank first, then name prefixes, then n-gram overlap (Dice coefficient).
+        """
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+
+        query_grams = name_ngrams(normalized, self.ngram_size)
+        overlap = Counter()
+        for gram in query_grams:
+            overlap.update(self._grams.get(gram, ()))
+
+        scores = {}
+        for appid, shared in overlap.items():
+            scores[appid] = 2.0 * shared / (len(query_grams) + self._gram_counts[appid])
+        for appid in self._prefix_matches(normalized, limit):
+            scores[appid] = scores.get(appid, 0.0) + 1.0
+            if self._normalized[appid] == normalized:
+                scores[appid] += 1.0
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -len(self._normalized[item[0]])))
+        return [{"appid": appid, "name": self._names[appid], "score": round(score, 4)} for appid, score in best]
@@ -0,0 +1,291 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from scipy.sparse import csr_matrix
+from src.quantization import top_k_indices
+from typing import Dict, List, Optional
+import numpy as np
+import atexit
+import os
+import threading
+import uuid
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Scoring a user against the full Steam app list is split over worker processes. The
+# compacted base game x tag matrix is copied once into shared memory, each worker scores
+# a contiguous shard of rows against it without a copy, keeps its local top-k, and only
+# those k candidates per shard travel back to be merged into the global top-k. Catalog
+# deltas since the last compaction are merged in by the owner, so only a compaction or
+# a full rebuild copies the matrix again.
+SCORING_WORKERS = int(os.environ.get("Scoring_Workers", "0")) or os.cpu_count() or 1
+# Below this many games one in-process pass is faster than a round trip to the workers
+SHARDED_SCORING_MIN_GAMES = int(os.environ.get("Sharded_Scoring_Min_Games", "50000"))
+
+
+class ScorerClosedError(RuntimeError):
+    """The scorer was replaced by one for a newer base matrix and released its shared memory"""
+
+
+# Rows multiplied per block, the users x block result is written transposed so every
+# user's scores end up contiguous for the top-k selection
+SCORE_BLOCK_ROWS = 8192
+
+
+def normalize_rows(matrix: csr_matrix) -> csr_matrix:
+    """Rows scaled to unit L2 norm (empty rows stay empty), so a dot product is a cosine"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    return csr_matrix(matrix.multiply(scale[:, None]), dtype=np.float32)
+
+
+def score_top_k(matrix: csr_matrix, user_vectors: np.ndarray, k: int, offset: int = 0,
+                excluded: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cosine top-k of every user vector against the rows of a row-normalized matrix.
+
+    Args:
+        matrix: games x tags rows to score, from normalize_rows
+        user_vectors: users x tags
+        k: Candidates kept per user
+        offset: Added to the returned row numbers (the shard's first row)
+        excluded: Rows of matrix that score -inf (removed or superseded games)
+
+    Returns:
+        (rows, scores), both k x users and unordered within a column
+    """
+    norms = np.linalg.norm(user_vectors, axis=1, keepdims=True)
+    user_vectors = np.divide(user_vectors, norms, out=np.zeros_like(user_vectors), where=norms > 0)
+    n_rows = matrix.shape[0]
+    if len(user_vectors) == 1:
+        # a single column is already contiguous once transposed, slicing blocks would only cost time
+        scores = np.asarray(matrix @ user_vectors.T, dtype=np.float32).T
+    else:
+        scores = np.empty((len(user_vectors), n_rows), dtype=np.float32)
+        for start in range(0, n_rows, SCORE_BLOCK_ROWS):
+            scores[:, start:start + SCORE_BLOCK_ROWS] = (matrix[start:start + SCORE_BLOCK_ROWS] @ user_vectors.T).T
+    if excluded is not None and len(excluded):
+        scores[:, excluded] = -np.inf
+    k = min(k, n_rows)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return (top + offset).T, np.take_along_axis(scores, top, axis=1).T
+
+
+def merge_top_k(shard_results: List[tuple[np.ndarray, np.ndarray]], k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Merge per-shard (rows, scores) candidates into the global top-k per user, best first"""
+    rows = np.concatenate([shard_rows for shard_rows, _ in shard_results])
+    scores = np.concatenate([shard_scores for _, shard_scores in shard_results])
+    top = top_k_indices(scores, k)
+    top_rows, top_scores = np.take_along_axis(rows, top, axis=0), np.take_along_axis(scores, top, axis=0)
+    order = np.argsort(-top_scores, axis=0, kind="stable")
+    return np.take_along_axis(top_rows, order, axis=0), np.take_along_axis(top_scores, order, axis=0)
+
+
+def shard_bounds(indptr: np.ndarray, n_shards: int) -> List[tuple[int, int]]:
+    """Split rows into at most n_shards contiguous ranges holding about the same number of tags"""
+    n_rows = len(indptr) - 1
+    targets = np.linspace(0, indptr[-1], n_shards + 1)[1:-1]
+    cuts = np.searchsorted(indptr, targets, side="left")
+    edges = np.unique(np.concatenate([[0], cuts, [n_rows]]))
+    return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:])]
+
+
+#-------------------------------------------------#
+# ----------WORKER SIDE---------------------------#
+#-------------------------------------------------#
+
+# token -> (attached segments, arrays); a worker keeps at most two catalog generations mapped
+_attached: Dict[str, tuple[List[SharedMemory], Dict[str, np.ndarray]]] = {}
+_shards: Dict[tuple, csr_matrix] = {}
+
+
+def _attach(layout: dict) -> Dict[str, np.ndarray]:
+    token = layout["token"]
+    if token not in _attached:
+        while len(_attached) >= 2:
+            old_token = next(iter(_attached))
+            for key in [key for key in _shards if key[0] == old_token]:
+                del _shards[key]
+            for segment in _attached.pop(old_token)[0]:
+                segment.close()
+        segments, arrays = [], {}
+        for name, (segment_name, dtype, length) in layout["arrays"].items():
+            # workers share the owner's resource tracker, so attaching does not add a second owner
+            segment = SharedMemory(name=segment_name)
+            segments.append(segment)
+            arrays[name] = np.ndarray((length,), dtype=dtype, buffer=segment.buf)
+        _attached[token] = (segments, arrays)
+    return _attached[token][1]
+
+
+def _score_shard(layout: dict, start: int, stop: int, user_vectors: np.ndarray, k: int,
+                 excluded: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k of one shard, run in a worker process against the shared matrix"""
+    key = (layout["token"], start, stop)
+    if key not in _shards:
+        arrays = _attach(layout)
+        indptr = arrays["indptr"][start:stop + 1]
+        begin, end = int(indptr[0]), int(indptr[-1])
+        matrix = csr_matrix((arrays["data"][begin:end], arrays["indices"][begin:end], indptr - indptr[0]),
+                            shape=(stop - start, layout["n_tags"]), copy=False)
+        _shards[key] = matrix
+    return score_top_k(_shards[key], user_vectors, k, offset=start, excluded=excluded - start)
+
+
+#-------------------------------------------------#
+# ----------OWNER SIDE----------------------------#
+#-------------------------------------------------#
+
+class ShardedScorer:
+    """
+    Catalog matrix in shared memory, scored shard by shard on a process pool.
+
+    Built from one base matrix of the catalog model (identified by base_id) and never
+    mutated, a compaction or rebuild gets a new scorer. Shared memory is released once
+    the scorer is closed and no query is in flight.
+    """
+
+    def __init__(self, matrix: csr_matrix, appids: List[Optional[str]], base_id: str, executor: Executor, n_shards: int):
+        self.base_id = base_id
+        self.appids = appids
+        self.n_tags = matrix.shape[1]
+        self.executor = executor
+        # rows are stored normalized, so the workers never divide by game norms
+        matrix = normalize_rows(matrix)
+        index_dtype = np.int32 if matrix.nnz < np.iinfo(np.int32).max else np.int64
+        arrays = {
+            "data": matrix.data.astype(np.float32),
+            "indices": matrix.indices.astype(index_dtype),
+            "indptr": matrix.indptr.astype(index_dtype),
+        }
+        self.shards = shard_bounds(arrays["indptr"], n_shards)
+        self._segments: List[SharedMemory] = []
+        self.layout = {"token": uuid.uuid4().hex, "n_tags": self.n_tags, "arrays": {}}
+        for name, array in arrays.items():
+            segment = SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[:] = array
+            self._segments.append(segment)
+            self.layout["arrays"][name] = (segment.name, array.dtype.str, len(array))
+        self._in_flight = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(segment.size for segment in self._segments)
+
+    @classmethod
+    def from_catalog_model(cls, catalog_model, executor: Executor, n_shards: int) -> "ShardedScorer":
+        matrix, appids, base_id = catalog_model.base_csr()
+        return cls(matrix, appids, base_id, executor, n_shards)
+
+    def top_k_rows(self, user_vectors: np.ndarray, k: int, excluded: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """Global top-k (rows, scores) per user, k x users and best first; excluded rows score -inf"""
+        user_vectors = np.atleast_2d(np.asarray(user_vectors, dtype=np.float32))
+        # tags added after the copy are not columns of the matrix, but still count in the user's norm
+        full_norms = np.linalg.norm(user_vectors, axis=1)
+        user_vectors = user_vectors[:, :self.n_tags]
+        norm_scale = np.divide(np.linalg.norm(user_vectors, axis=1), full_norms,
+                               out=np.ones_like(full_norms), where=full_norms > 0)
+        excluded = np.zeros(0, dtype=np.int64) if excluded is None else np.asarray(excluded, dtype=np.int64)
+        k = min(k, len(self.appids))
+        with self._lock:
+            if self._closed:
+                raise ScorerClosedError(f"Sharded scorer for base {self.base_id} is closed")
+            self._in_flight += 1
+        try:
+            futures = [self.executor.submit(_score_shard, self.layout, start, stop, user_vectors, k,
+                                            excluded[np.searchsorted(excluded, start):np.searchsorted(excluded, stop)])
+                       for start, stop in self.shards]
+            rows, scores = merge_top_k([future.result() for future in futures], k)
+            return rows, scores * norm_scale
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if self._closed and not self._in_flight:
+                    self._release()
+
+    def top_n(self, user_vector: np.ndarray, n: int = 20, excluded: np.ndarray = None) -> List[tuple[str, float]]:
+        """The n games most similar to user_vector as (appid, score) pairs, skipping the excluded rows"""
+        if n <= 0 or not self.appids:
+            return []
+        rows, scores = self.top_k_rows(user_vector, n, excluded)
+        return [(self.appids[row], float(score)) for row, score in zip(rows[:, 0], scores[:, 0]) if score > -np.inf]
+
+    def close(self):
+        """Release the shared memory once the queries in flight have finished"""
+        with self._lock:
+            self._closed = True
+            if not self._in_flight:
+                self._release()
+
+    def _release(self):
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+
+#-------------------------------------------------#
+# ----------PROCESS-WIDE SCORER-------------------#
+#-------------------------------------------------#
+
+_executor: Optional[ProcessPoolExecutor] = None
+_scorer: Optional[ShardedScorer] = None
+_scorer_lock = threading.Lock()
+
+
+def get_sharded_scorer(catalog_model) -> Optional[ShardedScorer]:
+    """Scorer for the catalog model's base matrix, None while the catalog is too small to be worth sharding"""
+    global _executor, _scorer
+    if len(catalog_model) < SHARDED_SCORING_MIN_GAMES:
+        return None
+    with _scorer_lock:
+        # deltas only touch the overlay, the matrix is copied again after a compaction or a rebuild
+        if _scorer is None or _scorer.base_id != catalog_model.base_id:
+            if _executor is None:
+                # spawned workers start clean instead of forking the app's threads and pooled connections
+                _executor = ProcessPoolExecutor(max_workers=SCORING_WORKERS, mp_context=get_context("spawn"))
+            if _scorer is not None:
+                _scorer.close()
+            _scorer = ShardedScorer.from_catalog_model(catalog_model, _executor, SCORING_WORKERS)
+            logger.info(f"Sharded catalog base of version {catalog_model.version} over {len(_scorer.shards)} shards "
+                        f"({len(_scorer.appids)} games, {_scorer.nbytes / 1e6:.1f} MB shared)")
+        return _scorer
+
+
+def catalog_top_n(catalog_model, user_vector: np.ndarray, n: int = 20) -> List[tuple[str, float]]:
+    """
+    Top n games for user_vector, sharded over the worker processes for large catalogs.
+
+    The workers score the shared base matrix without the rows removed or retagged since
+    the last compaction, and the overlay's own top n is merged in here.
+    """
+    scorer = get_sharded_scorer(catalog_model)
+    if scorer is not None:
+        base_id, excluded, pending = catalog_model.pending_top_n(user_vector, n)
+        if base_id == scorer.base_id:
+            try:
+                candidates = scorer.top_n(user_vector, n, excluded) + pending
+                return sorted(candidates, key=lambda candidate: -candidate[1])[:n]
+            except ScorerClosedError:
+                pass
+        # compacted or replaced between lookup and query
+        logger.info("Sharded scorer was replaced mid-query, scoring in process")
+    return catalog_model.top_n(user_vector, n)
+
+
+@atexit.register
+def shutdown_sharded_scoring():
+    """Stop the workers and release the shared catalog matrix"""
+    global _executor, _scorer
+    with _scorer_lock:
+        if _scorer is not None:
+            _scorer.close()
+            _scorer = None
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
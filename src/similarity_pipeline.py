@@ -1,10 +1,10 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, text
-from src.models import UserGame, UserRecommendation
-from sklearn.metrics.pairwise import cosine_similarity
+from src.models import UserRecommendation
+from src.catalog_model import get_catalog_model
+from src.sharded_scoring import catalog_top_n
+from src.utils.db_pool import run_hot_query
 import pandas as pd
 import uuid
-from typing import List
 import logging
 
 # Set up logging
@@ -15,77 +15,13 @@ class UserRecommendationService:
     def __init__(self, db_session: Session, database_url: str):
         self.db = db_session
         self.database_url = database_url
-        self.engine = create_engine(database_url)
 
     def fetch_user_games(self, username: str) -> pd.DataFrame:
         """Fetch all games for a specific user"""
-        query = text("SELECT username, appid FROM user_games WHERE username = :username")
-        with self.engine.connect() as conn:
-            result = conn.execute(query, {"username": username})
-            data = result.fetchall()
-            return pd.DataFrame(data, columns=['username', 'appid'])
-
-    def fetch_all_category(self) -> pd.DataFrame:
-        """Fetch all game tags"""
-        query = text("SELECT appid, category FROM category")
-        with self.engine.connect() as conn:
-            result = conn.execute(query)
-            data = result.fetchall()
-            return pd.DataFrame(data, columns=['appid', 'category'])
-
-    def create_game_vectors(self, tag_df: pd.DataFrame) -> tuple[pd.DataFrame, List[str], List[str]]:
-        """Create game vectors from tags"""
-        unique_tags = tag_df['category'].drop_duplicates().sort_values().tolist()
-        unique_games = tag_df['appid'].drop_duplicates().sort_values().tolist()
-        
-        game_vectors = []
-        for game in unique_games:
-            tags = tag_df[tag_df['appid'] == game]['category'].tolist()
-            vector = [1 if tag in tags else 0 for tag in unique_tags]
-            game_vectors.append(vector)
-        
-        return pd.DataFrame(game_vectors, columns=unique_tags, index=unique_games), unique_tags, unique_games
-
-    def create_user_vector(self, user_games_df: pd.DataFrame, game_vectors: pd.DataFrame, unique_tags: List[str]) -> pd.DataFrame:
-        """Create user vector from their played games"""
-        if user_games_df.empty:
-            return pd.DataFrame([[0] * len(unique_tags)], columns=unique_tags, index=['unknown_user'])
-        
-        username = user_games_df.iloc[0]['username']
-        user_games = user_games_df['appid'].tolist()
-        
-        # Only keep games that exist in game_vectors
-        user_games = [g for g in user_games if g in game_vectors.index]
-        
-        if not user_games:
-            user_vector = [0] * len(unique_tags)
-        else:
-            played_game_vectors = game_vectors.loc[user_games]
-            user_vector = played_game_vectors.mean(axis=0).tolist()
-        
-        return pd.DataFrame([user_vector], columns=unique_tags, index=[username])
-
-    def calculate_user_recommendations(self, user_vector: pd.DataFrame, game_vectors: pd.DataFrame, top_n: int = 20) -> pd.DataFrame:
-        """Calculate similarity between user vector and all game vectors"""
-        username = user_vector.index[0]
-        user_vector_data = user_vector.iloc[0].values.reshape(1, -1)
-        
-        # Calculate similarities
-        similarities = cosine_similarity(user_vector_data, game_vectors)
-        similarity_df = pd.DataFrame(similarities.T, index=game_vectors.index, columns=[username])
-        
-        # Get top N recommendations
-        top_games = similarity_df[username].nlargest(top_n)
-        
-        recommendations = []
-        for appid, similarity in top_games.items():
-            recommendations.append({
-                "username": username,
-                "appid": appid,
-                "similarity": float(similarity)
-            })
-        
-        return pd.DataFrame(recommendations)
+        # run on the session's own connection, a job must never hold two connections of the shared pool
+        result = run_hot_query(self.db, "user_games_by_username", {"username": username})
+        data = result.fetchall()
+        return pd.DataFrame(data, columns=['username', 'appid'])
 
     def delete_existing_recommendations(self, username: str):
         """Delete existing recommendations for a user"""
@@ -112,28 +48,34 @@ class UserRecommendationService:
             # 1. Fetch user's games
             user_games_df = self.fetch_user_games(username)
             if user_games_df.empty:
-                logger.warning(f"No games found for user: {username}")
+                logger.warning(f"No games found for user: {username}, serving the cold-start list")
+                self.delete_existing_recommendations(username)
                 return
             
-            # 2. Fetch all game tags
-            tag_df = self.fetch_all_category()
-            if tag_df.empty:
+            # 2. Get the shared catalog model (kept up to date by deltas, rebuilt only on a new catalog version)
+            catalog_model = get_catalog_model(self.db)
+            if not len(catalog_model):
                 logger.error("No game tags found in database")
                 return
             
-            # 3. Create game vectors
-            game_vectors, unique_tags, unique_games = self.create_game_vectors(tag_df)
-            
-            # 4. Create user vector
-            user_vector = self.create_user_vector(user_games_df, game_vectors, unique_tags)
+            # 3. Create user vector from the catalog model
+            user_vector = catalog_model.user_vector(user_games_df['appid'].astype(str))
+            if user_vector is None:
+                # scoring an all-zero vector would only produce meaningless similarities
+                logger.warning(f"None of the games of user {username} are in the catalog, serving the cold-start list")
+                self.delete_existing_recommendations(username)
+                return
             
-            # 5. Calculate recommendations
-            recommendations_df = self.calculate_user_recommendations(user_vector, game_vectors, top_n)
+            # 4. Calculate recommendations (sharded over worker processes once the catalog is large)
+            recommendations_df = pd.DataFrame(
+                [{"username": username, "appid": appid, "similarity": similarity}
+                 for appid, similarity in catalog_top_n(catalog_model, user_vector, top_n)],
+                columns=['username', 'appid', 'similarity'])
             
-            # 6. Delete existing recommendations
+            # 5. Delete existing recommendations
             self.delete_existing_recommendations(username)
             
-            # 7. Save new recommendations
+            # 6. Save new recommendations
             self.save_recommendations(recommendations_df)
             
             logger.info(f"Successfully generated {len(recommendations_df)} recommendations for user: {username}")
@@ -0,0 +1,45 @@
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, TypeVar
+import asyncio
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical reads into one execution.
+
+    The first request for a key runs the blocking call in a worker thread; requests for
+    the same key that arrive while it is in flight await the same result instead of
+    running their own query. Nothing is cached, the key is forgotten as soon as the call
+    finishes, so a request that starts afterwards always sees fresh data.
+
+    Keys are tuples whose first item names the route, which is also how metrics are
+    grouped. State lives on the event loop, so coalescing is per worker process.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"requests": 0, "executions": 0, "coalesced": 0})
+
+    async def do(self, key: tuple, fn: Callable[[], T]) -> T:
+        """Return fn()'s result, sharing one execution among concurrent callers with the same key"""
+        stats = self._stats[key[0]]
+        stats["requests"] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            stats["executions"] += 1
+            # a task rather than a direct await, so a disconnecting first caller does not cancel the others
+            task = asyncio.ensure_future(asyncio.to_thread(fn))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def metrics(self) -> dict:
+        """Per-route request, execution and coalesced counts plus the number of reads in flight"""
+        routes = {route: dict(stats) for route, stats in self._stats.items()}
+        for stats in routes.values():
+            stats["coalesced_ratio"] = stats["coalesced"] / stats["requests"] if stats["requests"] else 0.0
+        return {"in_flight": len(self._in_flight), "routes": routes}
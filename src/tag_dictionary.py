@@ -0,0 +1,74 @@
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List
+
+# Tags are stored once in the `tags` dictionary table and referenced from game_tags by a
+# SMALLINT id, so the association table holds (appid, tag_id) instead of repeating the
+# tag text for every game, and models can be built from integer ids without re-encoding.
+
+TAG_PAIRS_QUERY = text("SELECT gt.appid, t.name FROM game_tags gt JOIN tags t ON t.id = gt.tag_id")
+TAG_ID_PAIRS_QUERY = "SELECT appid, tag_id FROM game_tags"
+TAG_IDS_BY_NAME_QUERY = text("SELECT id, name FROM tags WHERE name IN :names").bindparams(bindparam("names", expanding=True))
+# ids come from the identity column, a name another writer added first is left as is
+INSERT_TAG_QUERY = text("INSERT INTO tags (name) VALUES (:name) ON CONFLICT (name) DO NOTHING")
+
+
+def encode_tags(pairs: "pd.DataFrame") -> tuple["pd.DataFrame", "pd.DataFrame"]:
+    """
+    Split (appid, category) rows, e.g. the output of pivot_tags, into a tag dictionary and an association table.
+
+    Args:
+        pairs: DataFrame with 'appid' and 'category' columns, one row per appid-category pair.
+
+    Returns:
+        tuple: (tags DataFrame with 'id' and 'name', game_tags DataFrame with 'appid' and 'tag_id')
+    """
+    # only the loaders encode tags, so the app does not pay for importing pandas
+    import numpy as np
+    import pandas as pd
+
+    names = sorted(pairs['category'].unique())
+    tags_df = pd.DataFrame({'id': np.arange(1, len(names) + 1, dtype=np.int16), 'name': names})
+    tag_ids = dict(zip(tags_df['name'], tags_df['id']))
+
+    game_tags_df = pd.DataFrame({
+        'appid': pairs['appid'].astype(str),
+        'tag_id': pairs['category'].map(tag_ids).astype(np.int16),
+    }).drop_duplicates().reset_index(drop=True)
+    return tags_df, game_tags_df
+
+
+def fetch_tag_dictionary(db: Session) -> Dict[int, str]:
+    """tag id -> tag name"""
+    return {tag_id: name for tag_id, name in db.execute(text("SELECT id, name FROM tags"))}
+
+
+def fetch_tag_id_pairs(db: Session) -> tuple["np.ndarray", "np.ndarray"]:
+    """All game_tags rows as parallel (appids, tag_ids) arrays"""
+    # the API imports TAG_PAIRS_QUERY from here at startup, numpy is only needed once a model is built
+    import numpy as np
+
+    # a raw DBAPI cursor returns plain tuples, building Row objects would dominate the load time
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(TAG_ID_PAIRS_QUERY)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    appids = np.array([appid for appid, _ in rows], dtype=str)
+    tag_ids = np.fromiter((tag_id for _, tag_id in rows), dtype=np.int64, count=len(rows))
+    return appids, tag_ids
+
+
+def get_or_create_tag_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Look up tag ids by name, adding unknown tags to the dictionary (the caller commits)"""
+    names = sorted(set(names))
+    if not names:
+        return {}
+    dictionary = {name: tag_id for tag_id, name in fetch_tag_dictionary(db).items()}
+    missing: List[str] = [name for name in names if name not in dictionary]
+    if missing:
+        # concurrent writers adding the same tag both end up with the id of the row that won
+        db.execute(INSERT_TAG_QUERY, [{"name": name} for name in missing])
+        dictionary.update({name: tag_id for tag_id, name in db.execute(TAG_IDS_BY_NAME_QUERY, {"names": missing})})
+    return {name: dictionary[name] for name in names}
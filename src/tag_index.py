@@ -0,0 +1,100 @@
+from typing import Iterable, List
+
+
+class TagBitmapIndex:
+    """
+    In-memory bitmap index over game_tags for faceted browsing.
+
+    Every game gets a dense ordinal (sorted by appid) and every tag a bitmap of the games
+    carrying it, stored as a Python int. Filtering is a chain of ANDs and each facet count
+    is one AND plus a popcount, all running in C over 64-bit words.
+    """
+
+    def __init__(self):
+        self.appids: List[str] = []              # ordinal -> appid
+        self.bitmaps: dict[str, int] = {}        # tag -> bitmap of game ordinals
+        self.all_games = 0
+
+    def __len__(self) -> int:
+        return len(self.appids)
+
+    def build(self, pairs: Iterable[tuple[str, str]]) -> "TagBitmapIndex":
+        """Build the index from (appid, tag) pairs such as the rows of game_tags"""
+        tags_by_game: dict[str, set[str]] = {}
+        for appid, tag in pairs:
+            tags_by_game.setdefault(str(appid), set()).add(tag)
+
+        self.appids = sorted(tags_by_game)
+        positions: dict[str, list[int]] = {}
+        for ordinal, appid in enumerate(self.appids):
+            for tag in tags_by_game[appid]:
+                positions.setdefault(tag, []).append(ordinal)
+
+        self.bitmaps = {tag: self._bitmap_from_positions(ordinals) for tag, ordinals in positions.items()}
+        self.all_games = (1 << len(self.appids)) - 1
+        return self
+
+    @staticmethod
+    def _bitmap_from_positions(ordinals: List[int]) -> int:
+        """Pack ordinals into an int by setting bits in a bytearray, which avoids quadratic int ORs"""
+        if not ordinals:
+            return 0
+        buffer = bytearray(max(ordinals) // 8 + 1)
+        for ordinal in ordinals:
+            buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+        return int.from_bytes(buffer, "little")
+
+    def filter(self, tags: List[str]) -> int:
+        """Bitmap of games carrying every tag in tags (all games when tags is empty)"""
+        result = self.all_games
+        for tag in tags:
+            result &= self.bitmaps.get(tag, 0)
+            if not result:
+                break
+        return result
+
+    def facet_counts(self, bitmap: int, exclude: List[str] = ()) -> dict[str, int]:
+        """Number of games in bitmap for each remaining tag, largest first, zero counts dropped"""
+        counts = {}
+        for tag, tag_bitmap in self.bitmaps.items():
+            if tag in exclude:
+                continue
+            count = (tag_bitmap & bitmap).bit_count()
+            if count:
+                counts[tag] = count
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+    def appids_from_bitmap(self, bitmap: int, offset: int = 0, limit: int = 50) -> List[str]:
+        """Decode a page of appids from a bitmap, in appid order"""
+        if limit <= 0:
+            return []
+        offset = max(offset, 0)
+        appids = []
+        skipped = 0
+        data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+        for byte_index, byte in enumerate(data):
+            if not byte:
+                continue
+            if skipped + byte.bit_count() <= offset:
+                skipped += byte.bit_count()
+                continue
+            for bit in range(8):
+                if not byte >> bit & 1:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                appids.append(self.appids[byte_index * 8 + bit])
+                if len(appids) == limit:
+                    return appids
+        return appids
+
+    def browse(self, tags: List[str], offset: int = 0, limit: int = 50) -> dict:
+        """Games tagged with every tag in tags, plus a count for each remaining tag"""
+        bitmap = self.filter(tags)
+        return {
+            "tags": tags,
+            "total": bitmap.bit_count(),
+            "appids": self.appids_from_bitmap(bitmap, offset, limit),
+            "facets": self.facet_counts(bitmap, exclude=tags),
+        }
@@ -0,0 +1,266 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text, insert
+from scipy.sparse import csr_matrix, hstack, vstack
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from src.models import GameSimilarity
+from src.catalog_model import get_catalog_model
+from src.similarity_pipeline import UserRecommendationService
+from src.utils.db_pool import get_session_factory
+from dotenv import load_dotenv
+import numpy as np
+import pandas as pd
+import argparse
+import os
+import re
+import threading
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Steam descriptions are HTML, tags would otherwise end up as tokens
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def _strip_html(document: str) -> str:
+    return HTML_TAG_PATTERN.sub(" ", document).lower()
+
+
+class GameTextIndex:
+    """
+    Fixed-width hashed term features for game descriptions.
+
+    The hashing trick needs no vocabulary, so descriptions can be encoded chunk by chunk
+    and only the current chunk's raw text is ever held in memory. A rebuild keeps the rows
+    of games whose description did not change and only hashes the others.
+    """
+
+    def __init__(self, n_features: int = 2 ** 18):
+        self.n_features = n_features
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            alternate_sign=False,
+            norm="l2",
+            stop_words="english",
+            preprocessor=_strip_html,
+            dtype=np.float32,
+        )
+        self.matrix = csr_matrix((0, n_features), dtype=np.float32)
+        self.appids: List[str] = []
+        self.fingerprints: Dict[str, int] = {}   # appid -> hash of the description it was encoded from
+        self.rehashed = 0                        # games hashed by the last build
+
+    def transform_chunk(self, chunk: pd.DataFrame) -> csr_matrix:
+        """Hash one chunk of games (appid, short_description, detailed_description)"""
+        documents = chunk["short_description"].fillna("") + " " + chunk["detailed_description"].fillna("")
+        return self.vectorizer.transform(documents)
+
+    def build(self, chunks: Iterable[pd.DataFrame]) -> "GameTextIndex":
+        """(Re)build the index from an iterable of description chunks, hashing only new or changed descriptions"""
+        positions = {appid: i for i, appid in enumerate(self.appids)}
+        blocks, appids, fingerprints = [], [], {}
+        rehashed = 0
+        for chunk in chunks:
+            chunk_appids = chunk["appid"].astype(str).tolist()
+            chunk_prints = [hash((short, detailed)) for short, detailed
+                            in zip(chunk["short_description"], chunk["detailed_description"])]
+            changed = [i for i, (appid, fingerprint) in enumerate(zip(chunk_appids, chunk_prints))
+                       if self.fingerprints.get(appid) != fingerprint]
+            kept = [i for i in range(len(chunk_appids)) if self.fingerprints.get(chunk_appids[i]) == chunk_prints[i]]
+            parts = [self.matrix[[positions[chunk_appids[i]] for i in kept]]]
+            if changed:
+                parts.append(self.transform_chunk(chunk.iloc[changed]))
+            # back to the chunk's row order
+            blocks.append(vstack(parts, format="csr")[np.argsort(kept + changed)])
+            appids.extend(chunk_appids)
+            fingerprints.update(zip(chunk_appids, chunk_prints))
+            rehashed += len(changed)
+        self.matrix = vstack(blocks, format="csr") if blocks else csr_matrix((0, self.n_features), dtype=np.float32)
+        self.appids = appids
+        self.fingerprints = fingerprints
+        self.rehashed = rehashed
+        return self
+
+
+def blend_feature_blocks(text_matrix: csr_matrix, text_appids: List[str], tag_matrix: csr_matrix,
+                         tag_appids: List[str], text_weight: float = 0.5) -> csr_matrix:
+    """
+    Concatenate l2-normalized text and tag features, each scaled by the square root of its weight.
+
+    A dot product between two blended rows is then text_weight * cos(text) + (1 - text_weight) * cos(tags),
+    so one sparse product gives the blended similarity. Rows follow text_appids; games
+    without tags get an empty tag block.
+    """
+    tag_positions = {appid: i for i, appid in enumerate(tag_appids)}
+    rows = [i for i, appid in enumerate(text_appids) if appid in tag_positions]
+    cols = [tag_positions[text_appids[i]] for i in rows]
+    selector = csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(text_appids), len(tag_appids)))
+    aligned_tags = selector @ normalize(csr_matrix(tag_matrix, dtype=np.float32))
+
+    return hstack([
+        np.sqrt(text_weight) * normalize(text_matrix),
+        np.sqrt(1.0 - text_weight) * aligned_tags,
+    ], format="csr")
+
+
+def top_similar_rows(features: csr_matrix, row_ids: np.ndarray, top_n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return (indices, scores) of the top_n most similar rows for each of row_ids, excluding the row itself"""
+    scores = (features[row_ids] @ features.T).toarray()
+    scores[np.arange(len(row_ids)), row_ids] = -np.inf
+    top_n = min(top_n, features.shape[0] - 1)
+    if top_n <= 0:
+        return np.empty((len(row_ids), 0), dtype=int), np.empty((len(row_ids), 0))
+    top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+#-------------------------------------------------#
+# ----------PROCESS-WIDE FEATURES-----------------#
+#-------------------------------------------------#
+
+# The hashed descriptions survive catalog versions (only changed games are re-hashed), the
+# blended features are rebuilt once per catalog version instead of once per recompute
+_text_index: Optional[GameTextIndex] = None
+_features: Optional[tuple] = None   # ((catalog version, text_weight, n_features), features, appids)
+_features_lock = threading.Lock()
+
+
+class TextRecommendationService(UserRecommendationService):
+    """Recommends games from hashed description features blended with tag similarity"""
+
+    def __init__(self, db_session: Session, database_url: str, text_weight: float = 0.5,
+                 n_features: int = 2 ** 18, chunk_size: int = 500):
+        super().__init__(db_session, database_url)
+        self.text_weight = text_weight
+        self.n_features = n_features
+        self.chunk_size = chunk_size
+
+    def iter_game_descriptions(self) -> Iterator[pd.DataFrame]:
+        """Stream game descriptions from the database in chunks of chunk_size rows"""
+        query = text("SELECT appid, short_description, detailed_description FROM games ORDER BY appid")
+        result = self.db.execute(query.execution_options(yield_per=self.chunk_size))
+        for partition in result.partitions():
+            yield pd.DataFrame(partition, columns=['appid', 'short_description', 'detailed_description'])
+
+    def build_feature_matrix(self) -> tuple[csr_matrix, List[str]]:
+        """
+        Blended text + tag feature matrix of the current catalog version, shared by the process.
+
+        The first call per catalog version makes one pass over the descriptions (hashing only
+        the games whose description changed), later calls reuse the cached matrix.
+        """
+        global _text_index, _features
+        catalog_model = get_catalog_model(self.db)
+        key = (catalog_model.version, self.text_weight, self.n_features)
+        with _features_lock:
+            if _features is None or _features[0] != key:
+                if _text_index is None or _text_index.n_features != self.n_features:
+                    _text_index = GameTextIndex(self.n_features)
+                _text_index.build(self.iter_game_descriptions())
+
+                tag_matrix, tag_appids = catalog_model.to_csr()
+                if tag_appids:
+                    features = blend_feature_blocks(_text_index.matrix, _text_index.appids,
+                                                    tag_matrix, tag_appids, self.text_weight)
+                else:
+                    features = normalize(_text_index.matrix)
+                _features = (key, features, _text_index.appids)
+                logger.info(f"Built hybrid features for catalog version {catalog_model.version}: "
+                            f"{len(_text_index.appids)} games, {_text_index.rehashed} descriptions hashed")
+            return _features[1], _features[2]
+
+    def calculate_blended_recommendations(self, username: str, user_games: List[str], features: csr_matrix,
+                                          appids: List[str], top_n: int = 20) -> pd.DataFrame:
+        """Score every game against the mean feature vector of the user's games"""
+        positions = {appid: i for i, appid in enumerate(appids)}
+        owned = [positions[appid] for appid in user_games if appid in positions]
+        if not owned:
+            return pd.DataFrame(columns=['username', 'appid', 'similarity'])
+
+        user_vector = normalize(csr_matrix(features[owned].mean(axis=0)))
+        scores = (features @ user_vector.T).toarray().ravel()
+        top_n = min(top_n, len(scores))
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        top = top[np.argsort(-scores[top])]
+
+        return pd.DataFrame({
+            "username": username,
+            "appid": [appids[i] for i in top],
+            "similarity": scores[top].astype(float),
+        })
+
+    def generate_recommendations_for_user(self, username: str, top_n: int = 20):
+        """Main method to generate blended text + tag recommendations for a specific user"""
+        try:
+            logger.info(f"Starting hybrid recommendation generation for user: {username}")
+
+            # 1. Fetch user's games
+            user_games_df = self.fetch_user_games(username)
+            if user_games_df.empty:
+                logger.warning(f"No games found for user: {username}, serving the cold-start list")
+                self.delete_existing_recommendations(username)
+                return
+
+            # 2. Build blended feature matrix
+            features, appids = self.build_feature_matrix()
+
+            # 3. Calculate recommendations
+            recommendations_df = self.calculate_blended_recommendations(
+                username, user_games_df['appid'].astype(str).tolist(), features, appids, top_n)
+
+            # 4. Replace existing recommendations
+            self.delete_existing_recommendations(username)
+            self.save_recommendations(recommendations_df)
+
+            logger.info(f"Successfully generated {len(recommendations_df)} hybrid recommendations for user: {username}")
+
+        except Exception as e:
+            logger.error(f"Error generating hybrid recommendations for user {username}: {str(e)}")
+            self.db.rollback()
+            raise
+
+    def generate_game_similarities(self, top_n: int = 10):
+        """Recompute the game_similarity table from blended features, chunk_size games at a time"""
+        try:
+            features, appids = self.build_feature_matrix()
+            self.db.query(GameSimilarity).delete()
+
+            for start in range(0, len(appids), self.chunk_size):
+                row_ids = np.arange(start, min(start + self.chunk_size, len(appids)))
+                neighbours, scores = top_similar_rows(features, row_ids, top_n)
+                rows = [
+                    {"id": uuid.uuid4(), "game1": appids[game], "game2": appids[other], "similarity": float(score)}
+                    for game, game_neighbours, game_scores in zip(row_ids, neighbours, scores)
+                    for other, score in zip(game_neighbours, game_scores)
+                ]
+                if rows:
+                    self.db.execute(insert(GameSimilarity), rows)
+
+            self.db.commit()
+            logger.info(f"Successfully generated game similarities for {len(appids)} games")
+
+        except Exception as e:
+            logger.error(f"Error generating game similarities: {str(e)}")
+            self.db.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    # Refill game_similarity after a catalog load, e.g.: python -m src.text_pipeline --top-n 10
+    load_dotenv(override=True)
+    parser = argparse.ArgumentParser(description="Recompute the game_similarity table from blended text + tag features")
+    parser.add_argument("--top-n", type=int, default=10, help="Similar games stored per game")
+    parser.add_argument("--text-weight", type=float, default=0.5, help="Share of the similarity taken from descriptions")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Games described and scored per chunk")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("External_Database_Url") or os.environ.get("Internal_Database_Url")
+    with get_session_factory(database_url)() as db:
+        service = TextRecommendationService(db, database_url, text_weight=args.text_weight, chunk_size=args.chunk_size)
+        service.generate_game_similarities(args.top_n)
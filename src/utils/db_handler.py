@@ -1,9 +1,10 @@
 from dotenv import load_dotenv
 import pandas as pd
-import psycopg2
 import os
 from psycopg2.extras import execute_values
+from sqlalchemy.engine import make_url
 import uuid
+from .db_pool import get_engine
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,11 +15,19 @@ class DatabaseHandler:
     def __init__(self, db_url:str=os.environ.get("POST_DB_LINK")):
 
         """Initialize the database connection."""
-        self.conn = psycopg2.connect(db_url, sslmode='require')
-        self.conn.autocommit = True  # Enable autocommit mode
+        # Borrow a connection from the shared pool instead of opening a dedicated one.
+        # SSL stays required unless the URL says otherwise, and it is set in the URL itself
+        # so the pool is still keyed by URL alone
+        url = make_url(db_url)
+        if "sslmode" not in url.query:
+            url = url.update_query_dict({"sslmode": "require"})
+        self.engine = get_engine(url.render_as_string(hide_password=False))
+        self.conn = self.engine.raw_connection()
+        self.conn.driver_connection.autocommit = True  # Enable autocommit mode
 
     def close(self):
-        """Close the database connection."""
+        """Return the database connection to the pool."""
+        self.conn.driver_connection.autocommit = False
         self.conn.close()
 
     def create_table(self,query:str):
@@ -36,6 +45,16 @@ class DatabaseHandler:
         cursor.close()
 
 
+    def execute_query(self, query: str):
+
+        """ Run a user specified statement that returns no rows (e.g. an UPDATE or upsert)."""
+
+        cursor = self.conn.cursor()
+        cursor.execute(query)
+        self.conn.commit()
+        cursor.close()
+
+
     def retrieve_all_from_table(self,table_name:str):
 
         """ Connect to the PostgreSQL database and retrieves all data from a user specified table"""
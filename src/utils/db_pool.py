@@ -0,0 +1,128 @@
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Dict, Sequence
+import os
+import re
+import threading
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# One pooled engine per database URL, shared by the app, background recomputes, the
+# recommendation services and DatabaseHandler, so a job borrows an already open
+# connection instead of paying for a new TCP + SSL handshake to Render.
+POOL_SIZE = int(os.environ.get("Db_Pool_Size", "5"))
+MAX_OVERFLOW = int(os.environ.get("Db_Max_Overflow", "10"))
+POOL_TIMEOUT = float(os.environ.get("Db_Pool_Timeout", "30"))
+POOL_RECYCLE = int(os.environ.get("Db_Pool_Recycle", "1800"))
+# Server-side prepared statements do not survive a transaction-pooling proxy such as PgBouncer
+PREPARE_HOT_QUERIES = os.environ.get("Db_Prepare_Hot_Queries", "true").lower() == "true"
+
+# Hot lookups, prepared on first use by each PostgreSQL connection and run with EXECUTE afterwards
+HOT_QUERIES = {
+    "user_games_by_username": "SELECT username, appid FROM user_games WHERE username = :username",
+    "recommendations_by_username": "SELECT id, username, appid, similarity FROM user_recommendations WHERE username = :username",
+    "similarities_by_game": "SELECT id, game1, game2, similarity FROM game_similarity WHERE game1 = :game1",
+}
+PARAMETER_PATTERN = re.compile(r":(\w+)")
+
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
+_counters: Dict[Engine, Dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+def _instrument(engine: Engine):
+    counters = _counters[engine] = {"connects": 0, "checkouts": 0, "checkins": 0, "prepared_statements": 0}
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        counters["connects"] += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        counters["checkins"] += 1
+
+
+def get_engine(database_url: str) -> Engine:
+    """
+    The shared pooled engine for a database URL (created on first use).
+
+    Engines are keyed by the URL alone, so connection settings such as sslmode belong in
+    the URL query string (e.g. ?sslmode=require) for every caller to get the same pool.
+    """
+    with _lock:
+        if database_url not in _engines:
+            options = {"pool_pre_ping": True}
+            if make_url(database_url).get_backend_name() != "sqlite":
+                options.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+                               pool_timeout=POOL_TIMEOUT, pool_recycle=POOL_RECYCLE)
+            engine = create_engine(database_url, **options)
+            _instrument(engine)
+            _engines[database_url] = engine
+        return _engines[database_url]
+
+
+def get_session_factory(database_url: str) -> sessionmaker:
+    """Session factory bound to the shared engine for a database URL"""
+    engine = get_engine(database_url)
+    with _lock:
+        if database_url not in _session_factories:
+            _session_factories[database_url] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        return _session_factories[database_url]
+
+
+def run_hot_query(db: Session, name: str, params: dict, columns: Sequence = ()):
+    """
+    Run one of HOT_QUERIES, through its prepared statement on PostgreSQL.
+
+    Args:
+        db: Session or Connection to run on
+        name: Key of HOT_QUERIES
+        params: Bind parameters by name
+        columns: Optional typed columns for the result (e.g. to get UUID objects back)
+    """
+    sql = HOT_QUERIES[name]
+    connection = db.connection() if isinstance(db, Session) else db
+    if PREPARE_HOT_QUERIES and connection.dialect.name == "postgresql":
+        names = list(dict.fromkeys(PARAMETER_PATTERN.findall(sql)))
+        # prepared statements live as long as the pooled DBAPI connection, remembered in its info dict
+        prepared = connection.connection.info.setdefault("prepared_hot_queries", set())
+        if name not in prepared:
+            positional = PARAMETER_PATTERN.sub(lambda match: f"${names.index(match.group(1)) + 1}", sql)
+            connection.exec_driver_sql(f"PREPARE {name} AS {positional}")
+            prepared.add(name)
+            _counters[connection.engine]["prepared_statements"] += 1
+        sql = f"EXECUTE {name}({', '.join(':' + param for param in names)})"
+    statement = text(sql)
+    if columns:
+        statement = statement.columns(*columns)
+    return db.execute(statement, params)
+
+
+def pool_stats() -> dict:
+    """Utilization and connection counters of every shared pool"""
+    stats = {}
+    for database_url, engine in list(_engines.items()):
+        pool = engine.pool
+        size = pool.size() if hasattr(pool, "size") else None
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else None
+        capacity = size + MAX_OVERFLOW if size is not None and hasattr(pool, "overflow") else None
+        stats[make_url(database_url).render_as_string(hide_password=True)] = {
+            "pool": type(pool).__name__,
+            "size": size,
+            "max_overflow": MAX_OVERFLOW if capacity is not None else None,
+            "checked_out": checked_out,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "utilization": checked_out / capacity if capacity else None,
+            **_counters.get(engine, {}),
+        }
+    return stats
@@ -0,0 +1,56 @@
+import os
+import uuid
+
+# Seeds a local database (e.g. SQLite) from the CSVs in Data/, standing in for the Render
+# PostgreSQL instance in the tests and the benchmarks. load_database.py is the production loader.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(PROJECT_ROOT, "Data")
+
+# Table -> CSV in Data/ it is loaded from
+SAMPLE_TABLES = {
+    "users": "steam_users.csv",
+    "games": "steam_games.csv",
+    "user_games": "steam_user_games.csv",
+    "user_recommendations": "user_recommendations.csv",
+    "tags": "steam_tags.csv",
+    "game_tags": "steam_game_tags.csv",
+}
+
+# Tables keyed by a composite primary key instead of a UUID id column
+TABLES_WITHOUT_ID = {"tags", "game_tags"}
+
+
+def seed_database(database_url: str) -> dict:
+    """Create the schema in a local database and load the bundled CSVs into it"""
+    # only tests and benchmarks seed databases, so the app does not pay for importing pandas
+    import pandas as pd
+    from sqlalchemy import create_engine, text
+    from src.models import Base
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            # WAL lets streaming reads run while background recomputes commit
+            conn.execute(text("PRAGMA journal_mode=WAL"))
+
+    frames = {}
+    for table, filename in SAMPLE_TABLES.items():
+        df = pd.read_csv(os.path.join(DATA_DIR, filename))
+        if table not in TABLES_WITHOUT_ID:
+            if "id" not in df.columns:
+                df["id"] = [str(uuid.uuid4()) for _ in range(len(df))]
+            # the ORM reads ids back as UUIDs, which SQLite stores as 32-char hex
+            df["id"] = [uuid.UUID(str(value)).hex for value in df["id"]]
+        if "appid" in df.columns:
+            df["appid"] = df["appid"].astype(str)
+        if "is_free" in df.columns:
+            df["is_free"] = df["is_free"].astype(str) == "True"
+        df.to_sql(table, engine, if_exists="append", index=False)
+        frames[table] = df
+    engine.dispose()
+
+    return {
+        "appids": frames["games"]["appid"].tolist(),
+        "usernames": frames["users"]["username"].tolist(),
+    }
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+from src.utils.sample_data import seed_database
+
+
+@pytest.fixture(scope="module")
+def seeded_database(tmp_path_factory):
+    """(database URL, {"appids", "usernames"}) of a fresh SQLite database loaded from Data/"""
+    database_url = f"sqlite:///{tmp_path_factory.mktemp('seeded') / 'seeded.sqlite'}"
+    return database_url, seed_database(database_url)
@@ -0,0 +1,70 @@
+"""
+Concurrent identical reads must be coalesced into a single database query.
+
+Seeds a throwaway SQLite database from Data/, fires identical concurrent requests at
+/api/v1/user_recommended_game/ and /api/v1/similar_games/ through the ASGI app, and
+counts the statements that reach the database. Each query is slowed down (standing in
+for a loaded database) so the requests overlap.
+
+Run from the project root:
+    python -m pytest -q tests
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+N_REQUESTS = 50
+QUERY_DELAY_SECONDS = 0.2
+
+# Route -> (query parameter, catalog key of its value, table its query reads)
+ROUTES = {
+    "/api/v1/user_recommended_game/": ("username", "usernames", "user_recommendations"),
+    "/api/v1/similar_games/": ("asin", "appids", "game_similarity"),
+}
+
+
+@pytest.fixture(scope="module")
+def seeded_app(seeded_database):
+    """The app bound to a freshly seeded SQLite database, with every statement recorded"""
+    database_url, catalog = seeded_database
+    os.environ["Internal_Database_Url"] = database_url
+
+    from sqlalchemy import event
+    import src.main
+
+    if str(src.main.engine.url) != database_url:
+        pytest.skip("src.main was already imported against another database")
+
+    queries = []
+
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+        time.sleep(QUERY_DELAY_SECONDS)
+
+    event.listen(src.main.engine, "before_cursor_execute", record_query)
+    yield src.main, catalog, queries
+    event.remove(src.main.engine, "before_cursor_execute", record_query)
+    src.main.engine.dispose()
+
+
+async def fire(app, path: str, params: dict, n_requests: int) -> list:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        return await asyncio.gather(*[client.get(path, params=params) for _ in range(n_requests)])
+
+
+@pytest.mark.parametrize("path", list(ROUTES))
+def test_identical_concurrent_reads_run_one_query(seeded_app, path):
+    main, catalog, queries = seeded_app
+    param, catalog_key, table = ROUTES[path]
+    queries.clear()
+
+    responses = asyncio.run(fire(main.app, path, {param: catalog[catalog_key][0]}, N_REQUESTS))
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    assert len([statement for statement in queries if table in statement]) == 1